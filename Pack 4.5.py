@@ -9,6 +9,34 @@ Esta versão combina todas as funcionalidades e correções, incluindo:
 - Lógica flexível para pareamento de linhas de tradução.
 - Tradução de arquivos .docx.
 - Adaptação de formalidade e correções contextuais.
+- Memória de tradução persistente (SQLite) com cache em memória limitado por bytes.
+- Tradução em lote: os segmentos são coletados, deduplicados e enviados ao modelo juntos.
+- Processamento paralelo de arquivos .rpy em vários núcleos (--workers).
+- Proteção de código por marcadores: a linha inteira vai ao modelo em uma só chamada.
+- Regras de pós-processamento compiladas uma vez e carregáveis de arquivos JSON.
+- Execuções incrementais e retomáveis com um manifesto de hashes por arquivo.
+- Leitura e gravação dos .rpy em streaming, com substituição atômica do arquivo.
+- Inicialização rápida: importações sob demanda e nada de rede se o modelo já está instalado.
+- Modo servidor: mantém o modelo carregado e atende vários clientes com lotes compartilhados.
+- Perfil de desempenho por etapa (--perfil) com relatório em JSON.
+- Backends de tradução intercambiáveis com ajustes de inferência (threads, beam,
+  quantização, lote em tokens), pela linha de comando ou por arquivo (--config).
+- Segmentação em frases: parágrafos longos são traduzidos e guardados na memória
+  frase a frase, e remontados com os espaços originais.
+- Memória de tradução aproximada (--aproximada): reaproveita traduções de frases
+  quase iguais (mudando só nomes, números ou a pontuação final), com um índice
+  de trigramas que pode ser carregado de arquivos .rpy já traduzidos.
+- Modos extrair / segmentos / injetar: exporta os textos pendentes em arquivos de
+  segmentos (divisíveis em shards), traduz cada shard em qualquer máquina e
+  devolve as traduções aos .rpy.
+- Vários idiomas de destino em uma só passada (--destinos pb,es,fr): os arquivos
+  são lidos uma vez, os modelos ficam carregados juntos dentro de um limite de
+  memória e cada idioma ganha sua própria pasta; as regras pt-BR só valem para pt-BR.
+- Varredura recursiva da pasta do jogo com pré-análise (linhas e caracteres
+  pendentes por arquivo), arquivos maiores primeiro e tempo restante estimado.
+- Tradução de .docx no próprio documento: corpo, tabelas, cabeçalhos, rodapés e
+  caixas de texto, com a formatação de cada trecho preservada e pastas inteiras
+  de documentos processadas em paralelo (--workers).
 """
 
 import os
@@ -16,19 +44,39 @@ import sys
 import re
 import shutil
 import argparse
-from functools import lru_cache
+import atexit
+import bisect
+import hashlib
+import io
+import json
+import queue
+import socket
+import socketserver
+import sqlite3
+import tempfile
+import threading
+import time
+import unicodedata
+import contextlib
+import difflib
+import math
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from collections import Counter, OrderedDict, namedtuple
 import subprocess # Importar o módulo subprocess
 
 # --- Bloco de Importação e Verificação de Dependências ---
-def install_and_import(package, install_name=None):
+def install_and_import(package, install_name=None, permitir_instalacao=True):
     if install_name is None:
         install_name = package
     try:
         __import__(package)
-        print(f"✅ Dependência '{package}' já instalada.")
     except ImportError:
         print("=" * 70)
         print(f"❌ A biblioteca '{package}' não foi encontrada.")
+        if not permitir_instalacao:
+            print("   Modo offline: a instalação automática está desativada.")
+            print(f"   Instale manualmente: pip install {install_name}")
+            sys.exit(1)
         print(f"   Tentando instalar '{install_name}' automaticamente...")
         try:
             # Usar sys.executable para garantir que pip do ambiente correto seja usado
@@ -46,23 +94,997 @@ def install_and_import(package, install_name=None):
             sys.exit(1)
         print("=" * 70)
 
-install_and_import('argostranslate')
-install_and_import('docx', install_name='python-docx') # python-docx é o nome do pacote para pip
+# As dependências são importadas só pelo modo que precisa delas: o modo docx não
+# carrega o Argos até a primeira tradução, e o modo rpy nunca importa o python-docx.
+
+def importar_argos():
+    """Importa (e instala, se necessário) o Argos Translate. Retorna (package, translate)."""
+    install_and_import('argostranslate', permitir_instalacao=not CONFIGURACAO['offline'])
+    from argostranslate import package, translate
+    return package, translate
 
-from argostranslate import package, translate
-import docx
+def importar_docx():
+    """Importa (e instala, se necessário) o python-docx."""
+    # python-docx é o nome do pacote para pip
+    install_and_import('docx', install_name='python-docx', permitir_instalacao=not CONFIGURACAO['offline'])
+    import docx
+    return docx
 
 # --- Variáveis Globais ---
 TRADUTOR = None
+MEMORIA = None
+DESTINO_ATUAL = "pb"  # idioma de destino de TRADUTOR/MEMORIA (ver ativar_destino())
+
+# Opções de execução preenchidas pela linha de comando (ver main()).
+CONFIGURACAO = {
+    'caminho_memoria': None,      # None = '.tradutor_memoria.sqlite3' na pasta de trabalho
+    'usar_memoria_disco': True,
+    'limpar_memoria': False,      # apaga as traduções guardadas deste par de idiomas ao abrir a memória
+    'limite_cache_mb': 64,
+    'tamanho_lote': 32,           # segmentos por chamada em lote ao modelo
+    'workers': 1,                 # processos paralelos nos modos rpy e docx (pasta)
+    'backend': 'argos',           # backend de tradução (ver BACKENDS)
+    'threads_modelo': 0,          # threads intra-operação do CTranslate2 por processo (0 = padrão da biblioteca)
+    'threads_trabalhador': 0,     # threads intra-operação derivadas de --workers quando threads_modelo é 0
+    'threads_inter': 1,           # lotes traduzidos em paralelo pelo CTranslate2
+    'beam_size': 4,               # 1 = decodificação gulosa (mais rápida, um pouco pior)
+    'tipo_calculo': 'default',    # compute_type do CTranslate2 ('int8', 'float32', ...)
+    'max_tokens_lote': 0,         # tamanho máximo de cada lote em tokens (0 = lote inteiro)
+    'segmentar_frases': True,     # traduz e guarda na memória cada frase separadamente
+    'limiar_aproximado': 0.0,     # semelhança mínima para reaproveitar uma tradução parecida (0 = desligado)
+    'pastas_aproximadas': [],     # pastas com .rpy já traduzidos para alimentar a memória aproximada
+    'destinos': ['pb'],           # idiomas de destino (--destinos pb,es,fr)
+    'limite_modelos_mb': 4096,    # memória máxima para os modelos carregados ao mesmo tempo
+    'sobrescrever_destinos': False,  # regrava os .rpy que já existem nas pastas dos outros idiomas
+    'protecao': 'mascara',        # 'mascara' (marcadores) ou 'divisao' (traduz cada fragmento)
+    'pasta_regras': None,         # pasta com regras extras de pós-processamento (.json)
+    'usar_manifesto': True,       # pula arquivos .rpy inalterados e já traduzidos
+    'retomar': False,             # continua a execução interrompida registrada no manifesto
+    'intervalo_checkpoint': 256,  # traduções entre gravações da memória em disco
+    'backup': True,               # cria '<arquivo>.rpy.bak' (hardlink) antes de regravar
+    'offline': False,             # nunca acessa a rede (sem índice, download ou pip)
+    'servidor': None,             # 'host:porta' de um tradutor residente (--modo servidor)
+    'perfil': None,               # arquivo JSON do relatório de desempenho (--perfil)
+}
+
+# Valores de 'beam_size' e 'tipo_calculo' com que as traduções da memória foram geradas
+# por padrão; outros valores ganham uma identidade de modelo própria na memória.
+DECODIFICACAO_PADRAO = {'beam_size': 4, 'tipo_calculo': 'default'}
+TIPOS_CALCULO = ['default', 'auto', 'int8', 'int8_float32', 'int8_float16', 'int16', 'float16', 'float32']
+
+PORTA_SERVIDOR_PADRAO = 8765
+
+NOME_MEMORIA_PADRAO = ".tradutor_memoria.sqlite3"
+NOME_PERFIL_PADRAO = "perfil_tradutor.json"
+NOME_MANIFESTO = ".tradutor_manifesto.json"
+NOME_SEGMENTOS_PADRAO = "segmentos.jsonl"
+SUFIXO_SEGMENTOS_TRADUZIDOS = ".traduzido.jsonl"
+
+# --- Perfil de Desempenho (--perfil) ---
+
+PERFIL = None
+
+# Limites superiores dos intervalos dos histogramas (o último intervalo é aberto).
+LIMITES_LATENCIA_MS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000]
+LIMITES_TAMANHO_SEGMENTO = [10, 20, 40, 80, 160, 320, 640, 1280]
+
+class PerfilExecucao:
+    """
+    Coleta tempos por etapa do pipeline, por arquivo, a latência das chamadas ao
+    modelo e o tamanho dos segmentos. Só existe com --perfil; sem ele, PERFIL é
+    None e medir_etapa() devolve um contexto vazio reaproveitado.
+    Os tempos das etapas são inclusivos: 'escrita_rpy' contém o pipeline de cada linha.
+    """
+
+    def __init__(self):
+        self.inicio = time.perf_counter()
+        self.etapas = {}
+        self.arquivos = []
+        self.latencia_modelo = [0] * (len(LIMITES_LATENCIA_MS) + 1)
+        self.chamadas_modelo = 0
+        self.segmentos_modelo = 0
+        self.segundos_modelo = 0.0
+        self.tamanho_segmentos = [0] * (len(LIMITES_TAMANHO_SEGMENTO) + 1)
+        self.memoria_trabalhadores = {}
+
+    @contextlib.contextmanager
+    def etapa(self, nome):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            acumulado = self.etapas.setdefault(nome, [0, 0.0])
+            acumulado[0] += 1
+            acumulado[1] += time.perf_counter() - inicio
+
+    def registrar_chamada_modelo(self, segundos, segmentos):
+        self.chamadas_modelo += 1
+        self.segmentos_modelo += segmentos
+        self.segundos_modelo += segundos
+        self.latencia_modelo[bisect.bisect_left(LIMITES_LATENCIA_MS, segundos * 1000)] += 1
+
+    def registrar_segmento(self, texto):
+        self.tamanho_segmentos[bisect.bisect_left(LIMITES_TAMANHO_SEGMENTO, len(texto))] += 1
+
+    def registrar_arquivo(self, caminho, segundos, linhas):
+        self.arquivos.append({'arquivo': caminho, 'segundos': round(segundos, 6), 'linhas_traduzidas': linhas})
+
+    def extrair_e_zerar(self):
+        """Retorna os dados coletados até aqui e recomeça (usado pelos processos de trabalho)."""
+        dados = {
+            'etapas': self.etapas, 'arquivos': self.arquivos, 'latencia_modelo': self.latencia_modelo,
+            'chamadas_modelo': self.chamadas_modelo, 'segmentos_modelo': self.segmentos_modelo,
+            'segundos_modelo': self.segundos_modelo, 'tamanho_segmentos': self.tamanho_segmentos,
+            'memoria_trabalhadores': self.memoria_trabalhadores,
+        }
+        inicio = self.inicio
+        self.__init__()
+        self.inicio = inicio
+        return dados
+
+    def mesclar(self, dados):
+        """Soma ao perfil os dados vindos de extrair_e_zerar() de outro processo."""
+        for nome, (chamadas, segundos) in dados['etapas'].items():
+            acumulado = self.etapas.setdefault(nome, [0, 0.0])
+            acumulado[0] += chamadas
+            acumulado[1] += segundos
+        self.arquivos.extend(dados['arquivos'])
+        self.latencia_modelo = [a + b for a, b in zip(self.latencia_modelo, dados['latencia_modelo'])]
+        self.tamanho_segmentos = [a + b for a, b in zip(self.tamanho_segmentos, dados['tamanho_segmentos'])]
+        self.chamadas_modelo += dados['chamadas_modelo']
+        self.segmentos_modelo += dados['segmentos_modelo']
+        self.segundos_modelo += dados['segundos_modelo']
+        for chave, valor in dados['memoria_trabalhadores'].items():
+            self.memoria_trabalhadores[chave] = self.memoria_trabalhadores.get(chave, 0) + valor
+
+    @staticmethod
+    def _histograma(limites, contagens, unidade):
+        rotulos = [f"<={limite}{unidade}" for limite in limites] + [f">{limites[-1]}{unidade}"]
+        return dict(zip(rotulos, contagens))
+
+    def relatorio(self, memoria=None):
+        memoria_estatisticas = dict(memoria.estatisticas()) if memoria is not None else {}
+        for chave, valor in self.memoria_trabalhadores.items():
+            memoria_estatisticas[chave] = memoria_estatisticas.get(chave, 0) + valor
+        consultas = memoria_estatisticas.get('consultas', 0)
+        if consultas:
+            acertos = sum(memoria_estatisticas.get(chave, 0)
+                          for chave in ('acertos_memoria', 'acertos_disco', 'acertos_aproximados'))
+            memoria_estatisticas['taxa_acerto'] = acertos / consultas
+        return {
+            'segundos_totais': round(time.perf_counter() - self.inicio, 6),
+            'etapas': {
+                nome: {'chamadas': chamadas, 'segundos': round(segundos, 6)}
+                for nome, (chamadas, segundos) in sorted(self.etapas.items(), key=lambda item: -item[1][1])
+            },
+            'modelo': {
+                'chamadas': self.chamadas_modelo,
+                'segmentos': self.segmentos_modelo,
+                'segundos': round(self.segundos_modelo, 6),
+                'segmentos_por_segundo': (self.segmentos_modelo / self.segundos_modelo) if self.segundos_modelo else 0.0,
+                'latencia_por_chamada': self._histograma(LIMITES_LATENCIA_MS, self.latencia_modelo, 'ms'),
+            },
+            'tamanho_segmentos': self._histograma(LIMITES_TAMANHO_SEGMENTO, self.tamanho_segmentos, ' chars'),
+            'memoria_traducao': memoria_estatisticas,
+            'arquivos': sorted(self.arquivos, key=lambda item: -item['segundos']),
+        }
+
+    def salvar(self, caminho, memoria=None):
+        try:
+            with open(caminho, 'w', encoding='utf-8') as f:
+                json.dump(self.relatorio(memoria), f, ensure_ascii=False, indent=2)
+            print(f"📊 Relatório de desempenho salvo em: {caminho}")
+        except OSError as e:
+            print(f"⚠️  Aviso: Não foi possível salvar o relatório de desempenho: {e}")
+
+_SEM_PERFIL = contextlib.nullcontext()
+
+def medir_etapa(nome):
+    """Contexto que mede a etapa `nome` se o perfil estiver ativo (custo quase nulo se não)."""
+    if PERFIL is None:
+        return _SEM_PERFIL
+    return PERFIL.etapa(nome)
+
+# --- Memória de Tradução Aproximada (--aproximada) ---
+
+LIMIAR_APROXIMADO_PADRAO = 0.7
+
+RE_TOKEN_APROXIMADO = re.compile(r'\w+|[^\w\s]')
+
+def _token_substituivel(token):
+    """Números e nomes próprios ('Mike', 'Eileen2') podem ser trocados na tradução reaproveitada."""
+    if 'zxq' in token.lower():
+        return False
+    return token.isdigit() or (len(token) > 1 and token.istitle())
+
+def adaptar_traducao(texto_novo, texto_antigo, traducao_antiga):
+    """
+    Adapta a tradução de texto_antigo para texto_novo quando a diferença entre os
+    dois é só de números/nomes (trocados na tradução, se aparecerem nela exatamente
+    uma vez) ou da pontuação final. Retorna None para qualquer outra diferença.
+    """
+    antigos = RE_TOKEN_APROXIMADO.findall(texto_antigo)
+    novos = RE_TOKEN_APROXIMADO.findall(texto_novo)
+    trocas = {}
+    pontuacao_final = None
+    comparador = difflib.SequenceMatcher(None, antigos, novos, autojunk=False)
+    for operacao, i1, i2, j1, j2 in comparador.get_opcodes():
+        if operacao == 'equal':
+            continue
+        trecho_antigo, trecho_novo = antigos[i1:i2], novos[j1:j2]
+        if (i2 == len(antigos) and j2 == len(novos)
+                and not any(token[0].isalnum() or token[0] == '_' for token in trecho_antigo + trecho_novo)):
+            pontuacao_final = (''.join(trecho_antigo), ''.join(trecho_novo))
+        elif (operacao == 'replace' and len(trecho_antigo) == 1 and len(trecho_novo) == 1
+                and _token_substituivel(trecho_antigo[0]) and _token_substituivel(trecho_novo[0])
+                and trecho_antigo[0] not in trocas):
+            trocas[trecho_antigo[0]] = trecho_novo[0]
+        else:
+            return None
+
+    traducao = traducao_antiga
+    if trocas:
+        padrao = re.compile(r'(?<!\w)(' + '|'.join(map(re.escape, trocas)) + r')(?!\w)')
+        encontrados = padrao.findall(traducao)
+        if sorted(encontrados) != sorted(trocas):
+            return None
+        traducao = padrao.sub(lambda m: trocas[m.group(1)], traducao)
+    if pontuacao_final is not None:
+        antiga, nova = pontuacao_final
+        nucleo = traducao.rstrip()
+        if not nucleo.endswith(antiga):
+            return None
+        traducao = nucleo[:len(nucleo) - len(antiga)] + nova
+    return traducao
+
+class IndiceAproximado:
+    """
+    Índice invertido de trigramas de caracteres sobre pares (texto, tradução).
+
+    buscar() percorre os trigramas do texto do mais raro para o mais comum (filtro
+    de prefixo: quem não compartilha nenhum dos len - mínimo + 1 mais raros não
+    alcança o limiar), contando em quantos deles cada par aparece, até gastar um
+    orçamento de entradas lidas. Os pares mais votados são medidos pelo coeficiente
+    de Dice e os que passam do limiar têm a tradução adaptada com adaptar_traducao().
+    O orçamento mantém a busca abaixo de um milissegundo mesmo com centenas de
+    milhares de pares, à custa de ignorar trigramas muito comuns.
+    """
+
+    TAMANHO_NGRAMA = 3
+    ORCAMENTO_POSTAGENS = 1500
+    MAXIMO_VERIFICADOS = 16
+    MAXIMO_CANDIDATOS = 5
+
+    def __init__(self, limiar=LIMIAR_APROXIMADO_PADRAO):
+        self.limiar = min(max(limiar, 0.01), 1.0)
+        self._textos = []
+        self._traducoes = []
+        self._ngramas = []
+        self._posicoes = {}
+        self._indice = {}
+
+    def __len__(self):
+        return len(self._textos)
+
+    def _extrair_ngramas(self, texto):
+        texto = f" {texto.lower()} "
+        return frozenset(texto[i:i + self.TAMANHO_NGRAMA] for i in range(len(texto) - self.TAMANHO_NGRAMA + 1))
+
+    def adicionar(self, texto, traducao):
+        posicao = self._posicoes.get(texto)
+        if posicao is not None:
+            self._traducoes[posicao] = traducao
+            return
+        posicao = len(self._textos)
+        ngramas = self._extrair_ngramas(texto)
+        self._posicoes[texto] = posicao
+        self._textos.append(texto)
+        self._traducoes.append(traducao)
+        self._ngramas.append(ngramas)
+        indice = self._indice
+        for ngrama in ngramas:
+            postagens = indice.get(ngrama)
+            if postagens is None:
+                indice[ngrama] = [posicao]
+            else:
+                postagens.append(posicao)
+
+    def buscar(self, texto):
+        """Retorna a tradução adaptada do par mais parecido acima do limiar, ou None."""
+        if not self._textos:
+            return None
+        ngramas = self._extrair_ngramas(texto)
+        # Dice >= limiar exige pelo menos `minimo` trigramas em comum.
+        minimo = math.ceil(self.limiar * len(ngramas) / (2 - self.limiar))
+        postagens = sorted((self._indice[ngrama] for ngrama in ngramas if ngrama in self._indice), key=len)
+        votos = Counter()
+        orcamento = self.ORCAMENTO_POSTAGENS
+        for lista in postagens[:len(ngramas) - minimo + 1]:
+            if len(lista) > orcamento and votos:
+                break
+            votos.update(lista)
+            orcamento -= len(lista)
+
+        pontuados = []
+        for posicao, _ in votos.most_common(self.MAXIMO_VERIFICADOS):
+            outros = self._ngramas[posicao]
+            semelhanca = 2 * len(ngramas & outros) / (len(ngramas) + len(outros))
+            if semelhanca >= self.limiar:
+                pontuados.append((semelhanca, posicao))
+        pontuados.sort(reverse=True)
+        for _, posicao in pontuados[:self.MAXIMO_CANDIDATOS]:
+            traducao = adaptar_traducao(texto, self._textos[posicao], self._traducoes[posicao])
+            if traducao is not None:
+                return traducao
+        return None
+
+# --- Memória de Tradução Persistente ---
+
+def normalizar_texto(texto):
+    """
+    Normaliza um texto para uso como chave da memória de tradução:
+    forma Unicode NFC, sem espaços nas bordas e com espaços internos colapsados.
+    """
+    texto = unicodedata.normalize('NFC', texto)
+    return ' '.join(texto.split())
+
+def separar_espacos(texto):
+    """Separa um texto em (espaços iniciais, núcleo, espaços finais)."""
+    nucleo = texto.strip()
+    if not nucleo:
+        return texto, '', ''
+    inicio = texto[:len(texto) - len(texto.lstrip())]
+    fim = texto[len(texto.rstrip()):]
+    return inicio, nucleo, fim
+
+def calcular_impressao_arquivo(caminho):
+    """
+    Gera uma impressão digital barata de um arquivo (nome, tamanho e data de
+    modificação), suficiente para perceber quando um .argosmodel foi trocado.
+    """
+    info = os.stat(caminho)
+    dados = f"{os.path.basename(caminho)}|{info.st_size}|{info.st_mtime_ns}"
+    return hashlib.sha1(dados.encode('utf-8')).hexdigest()
+
+class MemoriaTraducao:
+    """
+    Memória de tradução em duas camadas: um cache LRU em memória, limitado em
+    bytes, na frente de um banco SQLite opcional que sobrevive entre execuções.
+
+    As entradas são indexadas pelo texto normalizado, pelo par de idiomas e pela
+    identidade do modelo. Ao abrir o banco com uma identidade de modelo diferente
+    da registrada, as entradas antigas daquele par de idiomas são descartadas.
+    Variantes de decodificação do mesmo modelo ('<modelo>|beam=1,...') convivem.
+
+    Com um IndiceAproximado ativo (ativar_indice_aproximado()), uma consulta sem
+    resultado exato ainda tenta adaptar a tradução de um texto quase igual; essas
+    traduções ficam só no cache em memória, nunca no banco.
+    """
+
+    def __init__(self, caminho_banco=None, codigo_origem="en", codigo_destino="pb",
+                 identidade_modelo="desconhecido", limite_bytes=64 * 1024 * 1024,
+                 intervalo_gravacao=256):
+        self.caminho_banco = caminho_banco
+        self.intervalo_gravacao = max(1, intervalo_gravacao)
+        self.codigo_origem = codigo_origem
+        self.codigo_destino = codigo_destino
+        self.identidade_modelo = identidade_modelo
+        self.limite_bytes = limite_bytes
+
+        self._cache = OrderedDict()
+        self._bytes_cache = 0
+        self._pendentes = []
+        self._conexao = None
+
+        self.acertos_memoria = 0
+        self.acertos_disco = 0
+        self.falhas = 0
+        self.remocoes = 0
+        self.invalidadas = 0
+        self.acertos_aproximados = 0
+        self.indice_aproximado = None
+
+        if caminho_banco:
+            self._abrir_banco()
+            atexit.register(self.fechar)
+
+    # -- Banco de dados --
+
+    def _abrir_banco(self):
+        # Cada instância é usada por uma thread de cada vez; no modo servidor, a
+        # conexão é criada na thread principal e usada pela thread dos lotes.
+        self._conexao = sqlite3.connect(self.caminho_banco, timeout=30, check_same_thread=False)
+        self._conexao.execute("PRAGMA journal_mode=WAL")
+        self._conexao.execute("PRAGMA synchronous=NORMAL")
+        self._conexao.execute(
+            "CREATE TABLE IF NOT EXISTS traducoes ("
+            " chave TEXT PRIMARY KEY, origem TEXT NOT NULL, destino TEXT NOT NULL,"
+            " modelo TEXT NOT NULL, texto TEXT NOT NULL, traducao TEXT NOT NULL)"
+        )
+        self._conexao.execute(
+            "CREATE INDEX IF NOT EXISTS idx_traducoes_par ON traducoes (origem, destino, modelo)"
+        )
+        # Invalida automaticamente o que foi traduzido por outra versão do modelo.
+        modelo_base = self.identidade_modelo.split('|', 1)[0]
+        cursor = self._conexao.execute(
+            "DELETE FROM traducoes WHERE origem = ? AND destino = ? AND modelo != ?"
+            " AND substr(modelo, 1, ?) != ?",
+            (self.codigo_origem, self.codigo_destino, modelo_base,
+             len(modelo_base) + 1, modelo_base + '|'),
+        )
+        self.invalidadas = cursor.rowcount
+        self._conexao.commit()
+
+    def _chave(self, texto):
+        dados = f"{self.codigo_origem}\x1f{self.codigo_destino}\x1f{self.identidade_modelo}\x1f{texto}"
+        return hashlib.sha1(dados.encode('utf-8')).hexdigest()
+
+    def gravar_pendentes(self):
+        """Grava no disco as traduções ainda não persistidas."""
+        if self._conexao is None or not self._pendentes:
+            return
+        self._conexao.executemany(
+            "INSERT OR REPLACE INTO traducoes (chave, origem, destino, modelo, texto, traducao)"
+            " VALUES (?, ?, ?, ?, ?, ?)",
+            self._pendentes,
+        )
+        self._conexao.commit()
+        self._pendentes = []
+
+    def fechar(self):
+        """Grava as pendências e fecha o banco."""
+        if self._conexao is None:
+            return
+        self.gravar_pendentes()
+        self._conexao.close()
+        self._conexao = None
+
+    def invalidar(self):
+        """Remove todas as entradas deste par de idiomas (memória e disco)."""
+        self._cache.clear()
+        self._bytes_cache = 0
+        self._pendentes = []
+        if self._conexao is not None:
+            self._conexao.execute(
+                "DELETE FROM traducoes WHERE origem = ? AND destino = ?",
+                (self.codigo_origem, self.codigo_destino),
+            )
+            self._conexao.commit()
+
+    # -- Cache em memória --
+
+    def _guardar_no_cache(self, texto, traducao):
+        tamanho = sys.getsizeof(texto) + sys.getsizeof(traducao)
+        if texto in self._cache:
+            self._bytes_cache -= sys.getsizeof(texto) + sys.getsizeof(self._cache[texto])
+        self._cache[texto] = traducao
+        self._cache.move_to_end(texto)
+        self._bytes_cache += tamanho
+        while self._bytes_cache > self.limite_bytes and len(self._cache) > 1:
+            antigo, antiga_traducao = self._cache.popitem(last=False)
+            self._bytes_cache -= sys.getsizeof(antigo) + sys.getsizeof(antiga_traducao)
+            self.remocoes += 1
+
+    # -- API pública --
+
+    def obter(self, texto):
+        """Retorna a tradução de um texto já normalizado, ou None se não houver."""
+        traducao = self._cache.get(texto)
+        if traducao is not None:
+            self._cache.move_to_end(texto)
+            self.acertos_memoria += 1
+            return traducao
+        if self._conexao is not None:
+            linha = self._conexao.execute(
+                "SELECT traducao FROM traducoes WHERE chave = ?", (self._chave(texto),)
+            ).fetchone()
+            if linha is not None:
+                self.acertos_disco += 1
+                self._guardar_no_cache(texto, linha[0])
+                return linha[0]
+        if self.indice_aproximado is not None:
+            traducao = self.indice_aproximado.buscar(texto)
+            if traducao is not None:
+                self.acertos_aproximados += 1
+                self._guardar_no_cache(texto, traducao)
+                return traducao
+        self.falhas += 1
+        return None
+
+    def obter_aproximado(self, texto):
+        """
+        Nova tentativa na memória aproximada para um texto que obter() já contou como
+        falha (o índice pode ter recebido traduções parecidas desde então).
+        """
+        if self.indice_aproximado is None:
+            return None
+        traducao = self.indice_aproximado.buscar(texto)
+        if traducao is not None:
+            self.falhas -= 1
+            self.acertos_aproximados += 1
+            self._guardar_no_cache(texto, traducao)
+        return traducao
+
+    def guardar(self, texto, traducao):
+        """Armazena a tradução de um texto já normalizado."""
+        self._guardar_no_cache(texto, traducao)
+        if self.indice_aproximado is not None:
+            self.indice_aproximado.adicionar(texto, traducao)
+        if self._conexao is not None:
+            self._pendentes.append((
+                self._chave(texto), self.codigo_origem, self.codigo_destino,
+                self.identidade_modelo, texto, traducao,
+            ))
+            if len(self._pendentes) >= self.intervalo_gravacao:
+                self.gravar_pendentes()
+
+    def ativar_indice_aproximado(self, limiar=LIMIAR_APROXIMADO_PADRAO):
+        """Cria o índice aproximado com tudo o que já está na memória (cache e banco)."""
+        self.indice_aproximado = IndiceAproximado(limiar)
+        if self._conexao is not None:
+            self.gravar_pendentes()
+            linhas = self._conexao.execute(
+                "SELECT texto, traducao FROM traducoes WHERE origem = ? AND destino = ? AND modelo = ?",
+                (self.codigo_origem, self.codigo_destino, self.identidade_modelo),
+            )
+            for texto, traducao in linhas:
+                self.indice_aproximado.adicionar(texto, traducao)
+        for texto, traducao in self._cache.items():
+            self.indice_aproximado.adicionar(texto, traducao)
+        return self.indice_aproximado
+
+    def estatisticas(self):
+        consultas = self.acertos_memoria + self.acertos_disco + self.acertos_aproximados + self.falhas
+        acertos = self.acertos_memoria + self.acertos_disco + self.acertos_aproximados
+        return {
+            'consultas': consultas,
+            'acertos_memoria': self.acertos_memoria,
+            'acertos_disco': self.acertos_disco,
+            'acertos_aproximados': self.acertos_aproximados,
+            'falhas': self.falhas,
+            'taxa_acerto': (acertos / consultas) if consultas else 0.0,
+            'entradas_em_memoria': len(self._cache),
+            'bytes_em_memoria': self._bytes_cache,
+            'remocoes': self.remocoes,
+            'invalidadas': self.invalidadas,
+        }
+
+    def imprimir_resumo(self):
+        est = self.estatisticas()
+        if not est['consultas'] and not est['invalidadas']:
+            return
+        acertos = est['acertos_memoria'] + est['acertos_disco'] + est['acertos_aproximados']
+        print(f"🧠 Memória de tradução: {acertos}/{est['consultas']} acertos "
+              f"({est['taxa_acerto']:.0%}; {est['acertos_disco']} do disco), {est['falhas']} enviados ao modelo.")
+        if est['acertos_aproximados']:
+            print(f"   -> {est['acertos_aproximados']} reaproveitadas de frases parecidas (memória aproximada).")
+        if est['invalidadas']:
+            print(f"   -> {est['invalidadas']} entradas antigas descartadas (o modelo mudou).")
+
+MEMORIA = MemoriaTraducao()
 
 # --- Funções Principais de Tradução e Adaptação ---
 
-def configurar_tradutor(codigo_origem="en", codigo_destino="pb", diretorio_base="."):
+# Par de idiomas no nome de um pacote, como em 'translate-en_es-1_0.argosmodel'.
+RE_PAR_PACOTE = re.compile(r'(?<![a-z])([a-z]{2,3})[_-]([a-z]{2,3})(?![a-z])')
+
+def localizar_pacote_local(diretorio_base, codigo_origem=None, codigo_destino=None):
+    """
+    Retorna o caminho do .argosmodel em diretorio_base, ou None. Com o par de
+    idiomas, prefere o pacote cujo nome indica esse par e ignora os que indicam
+    outro; sem par no nome, vale o primeiro pacote da pasta.
+    """
+    sem_par = None
+    for nome_arquivo in sorted(os.listdir(diretorio_base)):
+        if not nome_arquivo.endswith(".argosmodel"):
+            continue
+        caminho = os.path.join(diretorio_base, nome_arquivo)
+        if codigo_origem is None:
+            return caminho
+        pares = RE_PAR_PACOTE.findall(nome_arquivo.lower())
+        if (codigo_origem, codigo_destino) in pares:
+            return caminho
+        if not pares and sem_par is None:
+            sem_par = caminho
+    return sem_par
+
+def identificar_modelo(codigo_origem, codigo_destino, diretorio_base="."):
+    """
+    Identifica o modelo em uso para a memória de tradução: a impressão digital do
+    .argosmodel local, se houver, ou a versão do pacote instalado no sistema.
+    """
+    try:
+        caminho_pacote_local = localizar_pacote_local(diretorio_base, codigo_origem, codigo_destino)
+    except FileNotFoundError:
+        caminho_pacote_local = None
+    if caminho_pacote_local:
+        return f"local:{calcular_impressao_arquivo(caminho_pacote_local)}"
+    try:
+        package, _ = importar_argos()
+        for pacote in package.get_installed_packages():
+            if pacote.from_code == codigo_origem and pacote.to_code == codigo_destino:
+                return f"sistema:{codigo_origem}-{codigo_destino}:{getattr(pacote, 'package_version', '?')}"
+    except Exception:
+        pass
+    return f"sistema:{codigo_origem}-{codigo_destino}"
+
+def descrever_decodificacao():
+    """
+    Sufixo da identidade do modelo para ajustes que mudam o texto traduzido
+    (beam e quantização). Vazio com os valores padrão, para não invalidar a memória.
+    """
+    ajustes = [f"{chave}={CONFIGURACAO[chave]}" for chave, padrao in DECODIFICACAO_PADRAO.items()
+               if CONFIGURACAO[chave] != padrao]
+    return ','.join(ajustes)
+
+def abrir_memoria(codigo_origem="en", codigo_destino="pb", diretorio_base="."):
+    """Cria a memória de tradução conforme as opções em CONFIGURACAO."""
+    caminho_banco = None
+    if CONFIGURACAO['usar_memoria_disco']:
+        caminho_banco = CONFIGURACAO['caminho_memoria'] or os.path.join(diretorio_base, NOME_MEMORIA_PADRAO)
+    identidade = identificar_modelo(codigo_origem, codigo_destino, diretorio_base)
+    decodificacao = descrever_decodificacao()
+    if decodificacao:
+        # Traduções de rascunho (ex.: beam 1 + int8) não se misturam com as definitivas.
+        identidade = f"{identidade}|{decodificacao}"
+    opcoes = {
+        'limite_bytes': int(CONFIGURACAO['limite_cache_mb'] * 1024 * 1024),
+        'intervalo_gravacao': CONFIGURACAO['intervalo_checkpoint'],
+    }
+    try:
+        memoria = MemoriaTraducao(caminho_banco, codigo_origem, codigo_destino, identidade, **opcoes)
+    except sqlite3.Error as e:
+        print(f"⚠️  Aviso: Não foi possível abrir a memória de tradução '{caminho_banco}': {e}")
+        print("    Continuando apenas com o cache em memória.")
+        memoria = MemoriaTraducao(None, codigo_origem, codigo_destino, identidade, **opcoes)
+    if caminho_banco and memoria.caminho_banco:
+        print(f"[*] Memória de tradução: {caminho_banco}")
+    if CONFIGURACAO['limpar_memoria']:
+        memoria.invalidar()
+        print(f"[*] Memória de tradução '{codigo_origem}' -> '{codigo_destino}' apagada (--limpar-memoria).")
+    return memoria
+
+# --- Backends de Tradução ---
+#
+# Todo backend expõe translate(texto) e traduzir_lote(textos); o atributo
+# memoria_persistente diz se as traduções dele podem ir para o banco em disco.
+
+class TradutorEmLote:
+    """
+    Backend 'argos': envolve uma tradução do Argos Translate e traduz vários textos
+    em uma única chamada ao modelo CTranslate2 que o Argos usa internamente, com os
+    ajustes de inferência de CONFIGURACAO:
+
+    - threads_modelo / threads_inter: threads por operação (intra_threads) e lotes
+      traduzidos em paralelo (inter_threads) pelo CTranslate2; sem threads_modelo,
+      vale threads_trabalhador, dividido entre os processos de --workers;
+    - beam_size: 4 por padrão; 1 é a decodificação gulosa, bem mais rápida em CPU;
+    - tipo_calculo: compute_type do modelo ('int8' troca um pouco de qualidade por
+      velocidade; 'default' mantém o tipo com que o modelo foi salvo);
+    - max_tokens_lote: divide cada lote em sublotes de até N tokens (0 = lote inteiro).
+
+    O Argos 1.9+ devolve a tradução embrulhada (CachedTranslation.underlying); o
+    pacote com o modelo é procurado por dentro dela. Se não houver pacote (por
+    exemplo, uma tradução composta por um idioma intermediário) ou ctranslate2 não
+    puder ser carregado, cai de volta para uma chamada translate() do Argos por
+    texto, e os ajustes acima não se aplicam.
+    """
+
+    memoria_persistente = True
+
+    # Textos maiores que isso seguem pelo Argos, que os divide em frases antes do modelo.
+    LIMITE_CARACTERES_LOTE = 400
+
+    def __init__(self, traducao_argos):
+        self.traducao_argos = traducao_argos
+        self._motor = None
+        self._motor_indisponivel = False
+
+    def tamanho_modelo_mb(self):
+        """Tamanho em disco do modelo, usado como estimativa da memória que ele ocupa."""
+        try:
+            pasta_modelo = os.path.join(str(self._pacote().package_path), "model")
+            return sum(entrada.stat().st_size for entrada in os.scandir(pasta_modelo)
+                       if entrada.is_file()) / (1024 * 1024)
+        except (AttributeError, OSError):
+            return 0.0
+
+    def translate(self, texto):
+        if len(texto) <= self.LIMITE_CARACTERES_LOTE and self._obter_motor() is not None:
+            return self.traduzir_lote([texto])[0]
+        return self.traducao_argos.translate(texto)
+
+    def _pacote(self):
+        """Pacote do Argos por trás da tradução, ou None (tradução composta, versão sem .pkg...)."""
+        traducao = self.traducao_argos
+        for _ in range(8):
+            pacote = getattr(traducao, 'pkg', None)
+            if pacote is not None:
+                return pacote
+            traducao = getattr(traducao, 'underlying', None)
+            if traducao is None:
+                break
+        return None
+
+    def _obter_motor(self):
+        if self._motor is not None or self._motor_indisponivel:
+            return self._motor
+        try:
+            import ctranslate2
+            pacote = self._pacote()
+            if pacote is None:
+                raise RuntimeError("a tradução do Argos não expõe o pacote do modelo")
+            caminho_pacote = str(pacote.package_path)
+            opcoes_modelo = {
+                'inter_threads': max(1, CONFIGURACAO['threads_inter']),
+                'compute_type': CONFIGURACAO['tipo_calculo'],
+            }
+            threads_modelo = CONFIGURACAO['threads_modelo'] or CONFIGURACAO['threads_trabalhador']
+            if threads_modelo:
+                opcoes_modelo['intra_threads'] = threads_modelo
+            tokenizador = obter_tokenizador_pacote(pacote)
+            tradutor = ctranslate2.Translator(os.path.join(caminho_pacote, "model"), device="cpu", **opcoes_modelo)
+            prefixo = getattr(pacote, "target_prefix", "") or ""
+            self._motor = (tradutor, tokenizador, prefixo)
+        except Exception as e:
+            print(f"⚠️  Aviso: Tradução em lote indisponível ({e}). Usando uma chamada por segmento.")
+            ignorados = ajustes_inferencia_definidos()
+            if ignorados:
+                print(f"⚠️  Aviso: Os ajustes {', '.join(ignorados)} só valem na tradução em lote e serão ignorados.")
+            self._motor_indisponivel = True
+        return self._motor
+
+    def traduzir_lote(self, textos):
+        """Traduz uma lista de textos, preservando a ordem."""
+        motor = self._obter_motor()
+        if motor is None:
+            return [self.translate(texto) for texto in textos]
+
+        resultados = [None] * len(textos)
+        indices_lote = []
+        for i, texto in enumerate(textos):
+            if len(texto) > self.LIMITE_CARACTERES_LOTE:
+                resultados[i] = self.traducao_argos.translate(texto)
+            else:
+                indices_lote.append(i)
+        if not indices_lote:
+            return resultados
+
+        tradutor, tokenizador, prefixo = motor
+        tokens = [tokenizador.encode(textos[i]) for i in indices_lote]
+        opcoes = {'max_batch_size': len(tokens)}
+        if prefixo:
+            opcoes['target_prefix'] = [[prefixo]] * len(tokens)
+        if CONFIGURACAO['max_tokens_lote']:
+            opcoes['max_batch_size'] = CONFIGURACAO['max_tokens_lote']
+            opcoes['batch_type'] = 'tokens'
+        saidas = tradutor.translate_batch(
+            tokens, replace_unknowns=True, beam_size=max(1, CONFIGURACAO['beam_size']),
+            length_penalty=0.2, **opcoes
+        )
+        for i, saida in zip(indices_lote, saidas):
+            tokens_saida = saida.hypotheses[0]
+            if prefixo and tokens_saida and tokens_saida[0] == prefixo:
+                tokens_saida = tokens_saida[1:]
+            resultados[i] = tokenizador.decode(tokens_saida).strip()
+        return resultados
+
+def ajustes_inferencia_definidos():
+    """
+    Opções de linha de comando dos ajustes de inferência que diferem do padrão.
+    Valores derivados pelo próprio script (como threads_trabalhador) não entram.
+    """
+    ajustes = []
+    if CONFIGURACAO['threads_modelo']:
+        ajustes.append('--threads-intra')
+    if CONFIGURACAO['threads_inter'] != 1:
+        ajustes.append('--threads-inter')
+    if CONFIGURACAO['beam_size'] != DECODIFICACAO_PADRAO['beam_size']:
+        ajustes.append('--beam')
+    if CONFIGURACAO['tipo_calculo'] != DECODIFICACAO_PADRAO['tipo_calculo']:
+        ajustes.append('--tipo-calculo')
+    if CONFIGURACAO['max_tokens_lote']:
+        ajustes.append('--max-tokens-lote')
+    return ajustes
+
+class TokenizadorSentencePiece:
+    """Tokenizador para versões do Argos sem Package.tokenizer (só conheciam sentencepiece.model)."""
+
+    def __init__(self, caminho_modelo):
+        import sentencepiece
+        self.processador = sentencepiece.SentencePieceProcessor(model_file=caminho_modelo)
+
+    def encode(self, texto):
+        return self.processador.encode(texto, out_type=str)
+
+    def decode(self, tokens):
+        return self.processador.decode(tokens)
+
+def obter_tokenizador_pacote(pacote):
+    """
+    Tokenizador do pacote: o do próprio Argos (pkg.tokenizer, que já escolhe entre
+    sentencepiece.model e bpe.model) ou, nas versões antigas, o sentencepiece.model.
+    """
+    tokenizador = getattr(pacote, 'tokenizer', None)
+    if tokenizador is not None:
+        return tokenizador
+    caminho_sentencepiece = os.path.join(str(pacote.package_path), "sentencepiece.model")
+    if os.path.isfile(caminho_sentencepiece):
+        return TokenizadorSentencePiece(caminho_sentencepiece)
+    raise RuntimeError("o pacote não tem tokenizador conhecido (sentencepiece.model ou bpe.model)")
+
+class TradutorSimulado:
+    """
+    Backend 'simulado': determinístico e sem modelo, para testes e medições.
+    Marca cada palavra com '~' sem traduzi-la, preserva os marcadores de código
+    (ZXQn) como um modelo real deveria e pode simular um custo fixo por chamada
+    e por segmento.
+    """
+
+    memoria_persistente = False
+
+    def __init__(self, custo_chamada_ms=0.0, custo_segmento_ms=0.0):
+        self.custo_chamada = custo_chamada_ms / 1000
+        self.custo_segmento = custo_segmento_ms / 1000
+        self.chamadas = 0
+        self.segmentos = 0
+
+    def _traduzir(self, texto):
+        return ' '.join(palavra if palavra.upper().startswith('ZXQ') else f"~{palavra}"
+                        for palavra in texto.split(' '))
+
+    def _custo(self, segmentos):
+        self.chamadas += 1
+        self.segmentos += segmentos
+        atraso = self.custo_chamada + self.custo_segmento * segmentos
+        if atraso:
+            time.sleep(atraso)
+
+    def translate(self, texto):
+        self._custo(1)
+        return self._traduzir(texto)
+
+    def traduzir_lote(self, textos):
+        self._custo(len(textos))
+        return [self._traduzir(texto) for texto in textos]
+
+def _criar_backend_argos(codigo_origem, codigo_destino, diretorio_base, preparar_pacotes):
+    return TradutorEmLote(configurar_tradutor(codigo_origem, codigo_destino, diretorio_base=diretorio_base,
+                                              preparar_pacotes=preparar_pacotes))
+
+def _criar_backend_simulado(codigo_origem, codigo_destino, diretorio_base, preparar_pacotes):
+    print("[*] Usando o tradutor simulado (nenhum modelo será carregado).")
+    return TradutorSimulado()
+
+def _criar_backend_remoto(codigo_origem, codigo_destino, diretorio_base, preparar_pacotes):
+    return TradutorRemoto(CONFIGURACAO['servidor'])
+
+# Backends disponíveis: nome -> fábrica(codigo_origem, codigo_destino, diretorio_base, preparar_pacotes).
+# 'remoto' é escolhido automaticamente quando há CONFIGURACAO['servidor'].
+BACKENDS = {
+    'argos': _criar_backend_argos,
+    'simulado': _criar_backend_simulado,
+    'remoto': _criar_backend_remoto,
+}
+
+def inicializar_traducao(diretorio_base, codigo_origem="en", codigo_destino="pb", preparar_pacotes=True):
+    """
+    Configura o tradutor global (pelo backend em CONFIGURACAO) e a memória de
+    tradução global. Com CONFIGURACAO['servidor'], usa o tradutor residente em vez
+    de carregar o modelo; a memória persistente fica com o servidor. Backends sem
+    memória persistente (remoto, simulado) ficam só com o cache em memória.
+    """
+    global TRADUTOR, MEMORIA, DESTINO_ATUAL
+    DESTINO_ATUAL = codigo_destino
+    nome_backend = 'remoto' if CONFIGURACAO['servidor'] else CONFIGURACAO['backend']
+    TRADUTOR = BACKENDS[nome_backend](codigo_origem, codigo_destino, diretorio_base, preparar_pacotes)
+    if TRADUTOR.memoria_persistente:
+        MEMORIA = abrir_memoria(codigo_origem, codigo_destino, diretorio_base=diretorio_base)
+    else:
+        MEMORIA = MemoriaTraducao(None, codigo_origem, codigo_destino, nome_backend,
+                                  limite_bytes=int(CONFIGURACAO['limite_cache_mb'] * 1024 * 1024))
+    if CONFIGURACAO['limiar_aproximado']:
+        preparar_memoria_aproximada()
+
+# --- Vários Idiomas de Destino (--destinos) ---
+
+# Destinos em que as regras de pós-processamento pt-BR fazem sentido.
+DESTINOS_COM_REGRAS_PTBR = {'pb', 'pt'}
+
+# Destinos escritos sem espaços entre as palavras (chinês, japonês, tailandês...).
+DESTINOS_SEM_ESPACOS = {'zh', 'zt', 'ja', 'th', 'lo', 'km', 'my'}
+
+# Nome da pasta/idioma do Ren'Py (game/tl/<idioma>) e rótulo dos arquivos de saída.
+NOMES_IDIOMAS_RENPY = {
+    'pb': 'portuguese', 'pt': 'portuguese', 'es': 'spanish', 'fr': 'french', 'de': 'german',
+    'it': 'italian', 'ru': 'russian', 'pl': 'polish', 'tr': 'turkish', 'ja': 'japanese',
+    'ko': 'korean', 'zh': 'chinese', 'uk': 'ukrainian', 'nl': 'dutch', 'id': 'indonesian',
+}
+ROTULOS_IDIOMAS = {'pb': 'pt-BR'}
+
+ContextoDestino = namedtuple('ContextoDestino', 'tradutor memoria tamanho_mb')
+
+# Tradutores e memórias já carregados, do menos para o mais recentemente usado.
+CONTEXTOS_DESTINO = OrderedDict()
+
+def _liberar_destinos(espaco_necessario_mb):
+    """Descarrega os destinos menos usados até sobrar espaco_necessario_mb no limite de memória."""
+    limite = CONFIGURACAO['limite_modelos_mb']
+    while CONTEXTOS_DESTINO and sum(c.tamanho_mb for c in CONTEXTOS_DESTINO.values()) + espaco_necessario_mb > limite:
+        codigo, contexto = CONTEXTOS_DESTINO.popitem(last=False)
+        contexto.memoria.fechar()
+        print(f"[*] Modelo '{codigo}' descarregado para respeitar o limite de {limite} MB.")
+
+def ativar_destino(diretorio_base, codigo_destino):
+    """
+    Aponta TRADUTOR/MEMORIA para o idioma de destino, carregando o modelo na
+    primeira vez. Os modelos ficam carregados juntos enquanto couberem em
+    CONFIGURACAO['limite_modelos_mb'] (estimado pelo tamanho em disco); se não
+    couberem, o menos usado recentemente é descarregado.
+    """
+    global TRADUTOR, MEMORIA, DESTINO_ATUAL
+    contexto = CONTEXTOS_DESTINO.get(codigo_destino)
+    if contexto is not None:
+        CONTEXTOS_DESTINO.move_to_end(codigo_destino)
+        TRADUTOR, MEMORIA, DESTINO_ATUAL = contexto.tradutor, contexto.memoria, codigo_destino
+        return
+    # Antes de carregar, supõe que o novo modelo tem o tamanho do maior já carregado.
+    _liberar_destinos(max((c.tamanho_mb for c in CONTEXTOS_DESTINO.values()), default=0.0))
+    inicializar_traducao(diretorio_base, "en", codigo_destino)
+    tamanho_mb = TRADUTOR.tamanho_modelo_mb() if hasattr(TRADUTOR, 'tamanho_modelo_mb') else 0.0
+    _liberar_destinos(tamanho_mb)
+    CONTEXTOS_DESTINO[codigo_destino] = ContextoDestino(TRADUTOR, MEMORIA, tamanho_mb)
+
+def rotulo_idioma(codigo_destino):
+    return ROTULOS_IDIOMAS.get(codigo_destino, codigo_destino)
+
+def preparar_memoria_aproximada():
+    """Ativa a memória aproximada com a memória atual e os .rpy traduzidos de CONFIGURACAO."""
+    indice = MEMORIA.ativar_indice_aproximado(CONFIGURACAO['limiar_aproximado'])
+    for pasta in CONFIGURACAO['pastas_aproximadas']:
+        for texto, traducao in carregar_pares_rpy(pasta):
+            indice.adicionar(texto, traducao)
+    print(f"[*] Memória aproximada: {len(indice)} pares indexados (limiar {indice.limiar:.2f}).")
+
+def buscar_idiomas_instalados(translate, codigo_origem, codigo_destino):
+    """Retorna (idioma_origem, idioma_destino) instalados no Argos, ou None onde faltar."""
+    idiomas_instalados = translate.get_installed_languages()
+    lang_origem = next((lang for lang in idiomas_instalados if lang.code == codigo_origem), None)
+    lang_destino = next((lang for lang in idiomas_instalados if lang.code == codigo_destino), None)
+    return lang_origem, lang_destino
+
+def pacote_local_ja_instalado(caminho_pacote_local):
+    """
+    True se este .argosmodel (mesma impressão digital) já foi instalado antes.
+    A impressão da última instalação fica em '<pacote>.argosmodel.instalado'.
+    """
+    try:
+        with open(f"{caminho_pacote_local}.instalado", 'r', encoding='utf-8') as f:
+            return f.read().strip() == calcular_impressao_arquivo(caminho_pacote_local)
+    except OSError:
+        return False
+
+def registrar_pacote_local_instalado(caminho_pacote_local):
+    try:
+        escrever_arquivo_atomico(f"{caminho_pacote_local}.instalado",
+                                 [calcular_impressao_arquivo(caminho_pacote_local)])
+    except OSError as e:
+        print(f"⚠️  Aviso: Não foi possível registrar a instalação do pacote local: {e}")
+
+def configurar_tradutor(codigo_origem="en", codigo_destino="pb", diretorio_base=".", preparar_pacotes=True):
     """
     Configura o tradutor do Argos Translate, procurando por pacotes locais
     (.argosmodel) antes de usar os pacotes do sistema.
+
+    O pacote local só é (re)instalado se ainda não estiver instalado com a mesma
+    impressão digital, e o índice online só é consultado quando o par de idiomas
+    não está disponível (nunca no modo offline).
+    Com preparar_pacotes=False, não instala nada nem acessa a rede (usado pelos
+    processos de trabalho, depois que o processo principal já o fez).
     """
     print(f"[*] Configurando tradutor de '{codigo_origem}' para '{codigo_destino}'...")
+    package, translate = importar_argos()
+    offline = CONFIGURACAO['offline']
 
     if codigo_destino == "pb":
         # Argos Translate usa 'pt' para Português, que geralmente inclui os modelos para pt-BR.
@@ -70,53 +1092,55 @@ def configurar_tradutor(codigo_origem="en", codigo_destino="pb", diretorio_base=
 
     caminho_pacote_local = None
     try:
-        for nome_arquivo in os.listdir(diretorio_base):
-            if nome_arquivo.endswith(".argosmodel"):
-                caminho_pacote_local = os.path.join(diretorio_base, nome_arquivo)
-                print(f"[*] Pacote de idioma local encontrado: {nome_arquivo}")
-                break
+        caminho_pacote_local = localizar_pacote_local(diretorio_base, codigo_origem, codigo_destino)
+        if caminho_pacote_local:
+            print(f"[*] Pacote de idioma local encontrado: {os.path.basename(caminho_pacote_local)}")
     except FileNotFoundError:
         print(f"⚠️  Aviso: O diretório base '{diretorio_base}' não foi encontrado para procurar pacotes locais.")
 
+    lang_origem, lang_destino = buscar_idiomas_instalados(translate, codigo_origem, codigo_destino)
+    par_disponivel = bool(lang_origem and lang_destino)
 
-    if caminho_pacote_local:
-        try:
-            print("[*] Instalando pacote local...")
-            package.install_from_path(caminho_pacote_local)
-            print("[*] Pacote local instalado com sucesso!")
-        except Exception as e:
-            print(f"❌ ERRO ao instalar o pacote local: {e}")
-            print("    O script tentará usar os pacotes já existentes no sistema.")
+    if not preparar_pacotes:
+        pass
+    elif caminho_pacote_local:
+        if par_disponivel and pacote_local_ja_instalado(caminho_pacote_local):
+            print("[*] Pacote local já instalado (impressão digital confere). Reinstalação dispensada.")
+        else:
+            try:
+                print("[*] Instalando pacote local...")
+                package.install_from_path(caminho_pacote_local)
+                registrar_pacote_local_instalado(caminho_pacote_local)
+                print("[*] Pacote local instalado com sucesso!")
+                lang_origem, lang_destino = buscar_idiomas_instalados(translate, codigo_origem, codigo_destino)
+            except Exception as e:
+                print(f"❌ ERRO ao instalar o pacote local: {e}")
+                print("    O script tentará usar os pacotes já existentes no sistema.")
     else:
         print("[*] Nenhum pacote de idioma local (.argosmodel) encontrado. Verificando pacotes do sistema.")
 
-    try:
-        package.update_package_index()
-    except Exception as e:
-        print(f"⚠️  Aviso: Não foi possível atualizar a lista de pacotes da internet: {e}")
-
-    idiomas_instalados = translate.get_installed_languages()
-    lang_origem = next((lang for lang in idiomas_instalados if lang.code == codigo_origem), None)
-    lang_destino = next((lang for lang in idiomas_instalados if lang.code == codigo_destino), None)
-
     if not lang_origem or not lang_destino:
         print("=" * 70)
         print(f"❌ ERRO CRÍTICO: Pacotes de idioma '{codigo_origem}' -> '{codigo_destino}' não foram carregados.")
         print("   Verifique se há um arquivo .argosmodel válido na pasta ou se os pacotes")
         print("   estão instalados corretamente no sistema (use: argos-translate-gui).")
         # Tentativa de download automático do pacote se não for encontrado e não houver pacote local
-        if not caminho_pacote_local:
+        if offline:
+            print("   Modo offline: o download automático do pacote está desativado.")
+        elif not caminho_pacote_local and preparar_pacotes:
             print(f"   Tentando baixar o pacote de idioma '{codigo_origem}' para '{codigo_destino}'...")
             try:
+                try:
+                    package.update_package_index()
+                except Exception as e:
+                    print(f"⚠️  Aviso: Não foi possível atualizar a lista de pacotes da internet: {e}")
                 available_packages = package.get_available_packages()
                 desired_package = next((p for p in available_packages if p.from_code == codigo_origem and p.to_code == codigo_destino), None)
                 if desired_package:
                     package.install_from_path(desired_package.download())
                     print(f"✅ Pacote '{codigo_origem}' para '{codigo_destino}' baixado e instalado com sucesso!")
                     # Recarregar idiomas após a instalação
-                    idiomas_instalados = translate.get_installed_languages()
-                    lang_origem = next((lang for lang in idiomas_instalados if lang.code == codigo_origem), None)
-                    lang_destino = next((lang for lang in idiomas_instalados if lang.code == codigo_destino), None)
+                    lang_origem, lang_destino = buscar_idiomas_instalados(translate, codigo_origem, codigo_destino)
                     if lang_origem and lang_destino:
                         print("[*] Tradutor configurado com sucesso após o download.")
                         return lang_origem.get_translation(lang_destino)
@@ -130,43 +1154,225 @@ def configurar_tradutor(codigo_origem="en", codigo_destino="pb", diretorio_base=
     print("[*] Tradutor configurado com sucesso.")
     return lang_origem.get_translation(lang_destino)
 
-@lru_cache(maxsize=16384)
+# --- Segmentação em Frases ---
+
+# Fim de frase: pontuação final, aspas/parênteses/marcadores de código que a fecham,
+# e o espaço até uma frase que começa com maiúscula, número ou aspas de abertura.
+RE_FIM_FRASE = re.compile(
+    r'([.!?…]+)(?:["\'”’»)]|ZXQ\d+)*(\s+)(?=(?:["\'“‘«(¡¿]|ZXQ\d+)*[A-Z0-9À-ÖØ-Þ])'
+)
+RE_PALAVRA_FINAL = re.compile(r'([\w.]+)$')
+
+# Palavras terminadas em ponto que não encerram a frase ("Mr. Smith", "e.g. this").
+ABREVIACOES = {
+    'mr', 'mrs', 'ms', 'dr', 'prof', 'sr', 'jr', 'st', 'mt', 'vs', 'etc', 'e.g', 'i.e',
+    'no', 'vol', 'fig', 'approx', 'dept', 'inc', 'ltd', 'co', 'capt', 'gen', 'lt', 'sgt',
+}
+
+def segmentar_frases(texto):
+    """
+    Divide um texto (sem espaços nas bordas) em frases. Retorna uma lista que
+    alterna frase, espaço original, frase, ...; com uma só frase, retorna [texto].
+    Os marcadores de código (ZXQn) nunca são cortados, então cada tag fica inteira
+    dentro de uma frase.
+    """
+    if not CONFIGURACAO['segmentar_frases']:
+        return [texto]
+    pedacos = []
+    inicio = 0
+    for match in RE_FIM_FRASE.finditer(texto):
+        if match.group(1) == '.':
+            palavra = RE_PALAVRA_FINAL.search(texto, inicio, match.start(1))
+            if palavra:
+                palavra = palavra.group(1).lower()
+                if palavra in ABREVIACOES or (len(palavra) == 1 and palavra.isalpha()):
+                    continue
+        pedacos.append(texto[inicio:match.start(2)])
+        pedacos.append(match.group(2))
+        inicio = match.end(2)
+    if not pedacos:
+        return [texto]
+    pedacos.append(texto[inicio:])
+    return pedacos
+
+def juntar_frases(pedacos, traducoes):
+    """
+    Remonta um texto segmentado com as traduções de cada frase ({frase normalizada:
+    tradução}), mantendo os espaços originais. Retorna None se faltar alguma frase.
+    """
+    partes = []
+    for i, pedaco in enumerate(pedacos):
+        if i % 2:
+            partes.append(pedaco)
+            continue
+        traducao = traducoes.get(normalizar_texto(pedaco))
+        if traducao is None:
+            return None
+        partes.append(traducao)
+    return ''.join(partes)
+
+def traduzir_segmento(texto_normalizado):
+    """Traduz um segmento normalizado (uma frase), consultando antes a memória de tradução."""
+    traducao = MEMORIA.obter(texto_normalizado)
+    if traducao is None:
+        if PERFIL is None:
+            traducao = TRADUTOR.translate(texto_normalizado)
+        else:
+            inicio_chamada = time.perf_counter()
+            traducao = TRADUTOR.translate(texto_normalizado)
+            PERFIL.registrar_chamada_modelo(time.perf_counter() - inicio_chamada, 1)
+        MEMORIA.guardar(texto_normalizado, traducao)
+    return traducao
+
 def traduzir_com_cache(texto_original):
     """
-    Traduz um texto usando o tradutor global e armazena o resultado em cache.
-    Ignora a string 'EMPTYSTRING'.
+    Traduz um texto usando o tradutor global, consultando antes a memória de
+    tradução (cache em memória + SQLite). Ignora a string 'EMPTYSTRING'.
+    Os espaços das bordas são preservados e não fazem parte da chave do cache.
+    Textos com várias frases são traduzidos e guardados frase a frase.
     """
     if not texto_original or not texto_original.strip() or texto_original == 'EMPTYSTRING':
         return texto_original
+    inicio, nucleo, fim = separar_espacos(texto_original)
+    pedacos = segmentar_frases(nucleo)
     try:
-        return TRADUTOR.translate(texto_original)
+        traducoes = {}
+        for pedaco in pedacos[::2]:
+            frase = normalizar_texto(pedaco)
+            if frase not in traducoes:
+                traducoes[frase] = traduzir_segmento(frase)
     except Exception as e:
         print(f"⚠️  Erro ao traduzir o texto '{texto_original[:50]}...': {e}")
         return texto_original
+    return f"{inicio}{juntar_frases(pedacos, traducoes)}{fim}"
 
-def traduzir_com_protecao_de_codigo(texto_com_codigo):
+# Expressão regular que captura tags com chaves OU variáveis com colchetes.
+RE_CODIGO_RENPY = re.compile(r'({[^}]+}|\[[^\]]+\])')
+
+def dividir_codigo(texto_com_codigo):
     """
-    Divide a string em texto e código Ren'Py ({...} ou [...]), traduz apenas o texto
-    e depois junta tudo novamente. Essencial para não corromper o jogo.
+    Divide a string em partes de texto e de código Ren'Py ({...} ou [...]).
+    Retorna uma lista de tuplas (parte, e_codigo), sem partes vazias.
     """
-    # Expressão regular que captura tags com chaves OU variáveis com colchetes.
-    padrao_codigo = r'({[^}]+}|\[[^\]]+\])'
-    
-    # Se não houver nenhum padrão de código, traduz a string inteira.
-    if not re.search(padrao_codigo, texto_com_codigo):
-        return traduzir_com_cache(texto_com_codigo)
-
-    partes = re.split(padrao_codigo, texto_com_codigo)
-    partes_traduzidas = []
-
-    for parte in partes:
+    partes = []
+    for parte in RE_CODIGO_RENPY.split(texto_com_codigo):
         if not parte:
             continue
         # Verifica se a parte é uma tag ou uma variável
         e_tag = parte.startswith('{') and parte.endswith('}')
         e_variavel = parte.startswith('[') and parte.endswith(']')
-        
-        if e_tag or e_variavel:
+        partes.append((parte, e_tag or e_variavel))
+    return partes
+
+# Marcadores que substituem tags e variáveis no modo 'mascara'. São sequências que o
+# modelo não traduz e que sobrevivem à tokenização; a busca tolera espaços e caixa.
+# Cada marcador fica separado das palavras vizinhas por um espaço (senão "ZXQ0brave"
+# vira um só token e a palavra não é traduzida); os espaços que não existiam no
+# original saem na restauração.
+FORMATO_MARCADOR = "ZXQ{}"
+RE_MARCADOR = re.compile(r'Z\s?X\s?Q\s?(\d+)', re.IGNORECASE)
+RE_MARCADOR_COM_ESPACOS = re.compile(r'(\s*)Z\s?X\s?Q\s?(\d+)(\s*)', re.IGNORECASE)
+RE_LETRA = re.compile(r'[^\W\d_]')
+
+# Um código mascarado e se, no original, ele estava grudado no que vem antes/depois.
+CodigoMascarado = namedtuple('CodigoMascarado', 'texto colado_antes colado_depois')
+
+def trocar_codigos_por_marcadores(texto, indice_do_codigo):
+    """
+    Troca cada tag/variável de `texto` pelo marcador de índice indice_do_codigo(codigo),
+    com um espaço entre o marcador e a letra ou número grudado nele. Retorna
+    (texto_com_marcadores, [CodigoMascarado, ...]); se indice_do_codigo devolver
+    None, o código fica como está.
+    """
+    partes, codigos = [], []
+    posicao = 0
+    for match in RE_CODIGO_RENPY.finditer(texto):
+        indice = indice_do_codigo(match.group(0))
+        if indice is None:
+            continue
+        colado_antes = match.start() > 0 and not texto[match.start() - 1].isspace()
+        colado_depois = match.end() < len(texto) and not texto[match.end()].isspace()
+        codigos.append(CodigoMascarado(match.group(0), colado_antes, colado_depois))
+        partes.append(texto[posicao:match.start()])
+        # Só letras e números formam um token com o marcador; pontuação pode ficar grudada.
+        if colado_antes and texto[match.start() - 1].isalnum():
+            partes.append(' ')
+        partes.append(FORMATO_MARCADOR.format(indice))
+        if colado_depois and texto[match.end()].isalnum():
+            partes.append(' ')
+        posicao = match.end()
+    partes.append(texto[posicao:])
+    return ''.join(partes), codigos
+
+def _marcador_colado(texto, match, codigo):
+    """
+    Indica se o modelo grudou o marcador em uma letra de um lado em que, no
+    original, o código estava separado por espaço (juntou o código a uma palavra).
+    """
+    if not codigo.colado_antes and match.start() > 0 and RE_LETRA.match(texto[match.start() - 1]):
+        return True
+    return (not codigo.colado_depois and RE_LETRA.match(texto, match.end()) is not None
+            and RE_MARCADOR.match(texto, match.end()) is None)
+
+def mascarar_codigo(texto_com_codigo):
+    """
+    Troca cada tag/variável Ren'Py por um marcador numerado.
+    Retorna (texto_mascarado, lista_de_CodigoMascarado), ou None quando a máscara não se
+    aplica (texto já contém algo parecido com um marcador, ou não há texto a traduzir).
+    """
+    if RE_MARCADOR.search(texto_com_codigo):
+        return None
+    contador = iter(range(len(texto_com_codigo)))
+    texto_mascarado, codigos = trocar_codigos_por_marcadores(texto_com_codigo, lambda codigo: next(contador))
+    texto_sem_codigo = RE_CODIGO_RENPY.sub('', texto_com_codigo)
+    if not any(c.isalpha() for c in texto_sem_codigo):
+        return None
+    return texto_mascarado, codigos
+
+def restaurar_codigo(texto_traduzido, codigos):
+    """
+    Devolve as tags/variáveis originais no lugar dos marcadores, tirando os espaços
+    que mascarar_codigo() acrescentou. Retorna None se algum marcador se perdeu,
+    foi duplicado, inventado ou grudado em uma palavra pelo modelo. Nos idiomas
+    escritos sem espaços (DESTINOS_SEM_ESPACOS), marcador junto de letra é normal.
+    """
+    marcadores = list(RE_MARCADOR.finditer(texto_traduzido))
+    if sorted(int(m.group(1)) for m in marcadores) != list(range(len(codigos))):
+        return None
+    if DESTINO_ATUAL not in DESTINOS_SEM_ESPACOS and any(
+            _marcador_colado(texto_traduzido, m, codigos[int(m.group(1))]) for m in marcadores):
+        return None
+    def trocar(match):
+        codigo = codigos[int(match.group(2))]
+        antes = '' if codigo.colado_antes else match.group(1)
+        depois = '' if codigo.colado_depois else match.group(3)
+        return f"{antes}{codigo.texto}{depois}"
+    return RE_MARCADOR_COM_ESPACOS.sub(trocar, texto_traduzido)
+
+def traduzir_com_protecao_de_codigo(texto_com_codigo):
+    """
+    Traduz um texto preservando o código Ren'Py ({...} ou [...]). Essencial para
+    não corromper o jogo.
+
+    No modo 'mascara', o código vira marcadores e a linha inteira é traduzida em
+    uma única chamada, com o contexto completo da frase. Se algum marcador não
+    sobreviver à tradução, usa a divisão: traduz cada trecho de texto separadamente.
+    """
+    # Se não houver nenhum padrão de código, traduz a string inteira.
+    if not RE_CODIGO_RENPY.search(texto_com_codigo):
+        return traduzir_com_cache(texto_com_codigo)
+
+    if CONFIGURACAO['protecao'] == 'mascara':
+        mascara = mascarar_codigo(texto_com_codigo)
+        if mascara is not None:
+            texto_mascarado, codigos = mascara
+            restaurado = restaurar_codigo(traduzir_com_cache(texto_mascarado), codigos)
+            if restaurado is not None:
+                return restaurado
+
+    partes_traduzidas = []
+    for parte, e_codigo in dividir_codigo(texto_com_codigo):
+        if e_codigo:
             # Se for código, mantém original
             partes_traduzidas.append(parte)
         else:
@@ -175,285 +1381,1860 @@ def traduzir_com_protecao_de_codigo(texto_com_codigo):
 
     return "".join(partes_traduzidas)
 
-def detectar_formalidade_ingles(texto):
+def extrair_unidades_traducao(texto_original, dividir=False):
     """
-    Analisa o texto em inglês usando um sistema de pontuação ponderada para
-    determinar o tom com alta precisão.
-    """
-    PONTUACAO_FORMALIDADE = {
-        'sincerely': 5, 'yours faithfully': 5, 'to whom it may concern': 5, 'regards': 4,
-        'esteemed': 4, 'mr.': 3, 'mrs.': 3, 'ms.': 3, 'madam': 4, 'sir': 4, 'furthermore': 3,
-        'consequently': 3, 'nevertheless': 3, 'henceforth': 3, 'therefore': 2, 'additionally': 2,
-        'moreover': 2, 'subsequently': 2, 'thus': 2, 'inquire': 3, 'procure': 3, 'endeavor': 3,
-        'commence': 2, 'facilitate': 2, 'ascertain': 2, 'request': 1, 'require': 1, 'assistance': 2,
-        'clarification': 2, 'gratitude': 2, 'opportunity': 1, 'documentation': 2, 'pertaining': 2,
-        'shall': 2, 'kindly': 1, 'lmao': -5, 'rofl': -5, 'omg': -4, 'btw': -3, 'fyi': -3, 'imo': -3,
-        'lol': -3, 'ain\'t': -4, 'cuz': -3, 'gonna': -2, 'wanna': -2, 'gotta': -2, 'dunno': -2,
-        'lemme': -2, 'gimme': -2, 'can\'t': -1, 'don\'t': -1, 'won\'t': -1, 'i\'m': -1, 'you\'re': -1,
-        'dude': -3, 'bro': -3, 'yo': -3, 'sup': -3, 'what\'s up': -3, 'my bad': -3, 'for real': -2,
-        'no worries': -2, 'hang out': -2, 'chill': -2, 'awesome': -2, 'dope': -2, 'sick': -2,
-        'lit': -2, 'cool': -1, 'man': -2, 'buddy': -2, 'pal': -2, 'folks': -1, 'hey': -1,
-        'yeah': -1, 'yep': -1
-    }
-    LIMIAR_NEUTRO = 3
-    texto_lower = texto.lower()
-    pontuacao_total = 0
-    for termo, peso in PONTUACAO_FORMALIDADE.items():
-        padrao = r'\b' + re.escape(termo) + r'\b'
-        ocorrencias = re.findall(padrao, texto_lower)
-        pontuacao_total += len(ocorrencias) * peso
-
-    if pontuacao_total > LIMIAR_NEUTRO:
-        return 'formal'
-    elif pontuacao_total < -LIMIAR_NEUTRO:
-        return 'informal'
+    Retorna os textos que processar_paragrafo_completo() enviaria ao modelo para
+    este bloco (frase a frase), já normalizados como chaves da memória de tradução.
+    Com dividir=True, retorna os fragmentos do caminho de divisão, mesmo no modo 'mascara'.
+    """
+    if not texto_original or not texto_original.strip() or texto_original == 'EMPTYSTRING':
+        return []
+    if not RE_CODIGO_RENPY.search(texto_original):
+        partes = [texto_original]
     else:
-        return 'neutro'
+        mascara = None
+        if CONFIGURACAO['protecao'] == 'mascara' and not dividir:
+            mascara = mascarar_codigo(texto_original)
+        if mascara is not None:
+            partes = [mascara[0]]
+        else:
+            partes = [parte for parte, e_codigo in dividir_codigo(texto_original) if not e_codigo]
+    unidades = []
+    for parte in partes:
+        if not parte.strip() or parte == 'EMPTYSTRING':
+            continue
+        unidades.extend(normalizar_texto(frase) for frase in segmentar_frases(parte.strip())[::2])
+    return unidades
 
-def aplicar_correcoes_contextuais_ptbr(texto_traduzido):
+def traduzir_lote(textos, exibir_progresso=True):
     """
-    Aplica um conjunto de regras de substituição para corrigir traduções literais
-    e outros erros comuns.
+    Traduz uma lista de textos já normalizados, consultando a memória de tradução.
+    Os textos ausentes são deduplicados, ordenados por tamanho e enviados ao modelo
+    em lotes de CONFIGURACAO['tamanho_lote']. Retorna {texto: tradução}; textos
+    que não puderam ser traduzidos ficam de fora.
+    Com a memória aproximada ativa, textos quase iguais a outro pendente esperam a
+    tradução dele e só vão ao modelo se ela não puder ser adaptada.
     """
-    REGRAS_CORRECAO_CONTEXTUAL = {
-        r'\b(eu\s+congelo|tô\s+congelando)\b': 'Eu paro',
-        r'\bfazem\s+uma\s+abelha\b': 'vão direto',
-        r'\b(em\s+sua\s+mãe|na\s+sua\s+mãe)\b': 'na boca dele',
-        r'\bcolocando\s+o\s+bolo\s+em\s+sua\s+mãe\b': 'colocando o bolo na boca',
-        r'\bgarras\s+copulam\b': 'garras perfuram',
-        r'Quieres\s+peloar!\s+Sem\s+mim\s+jodas!': 'Quer brigar! Não fode comigo!',
-        r'\bnão\s+na\s+véi\b': 'no rosto não, cara!',
-        r'\bpode\s+tocar\s+na\s+minha\s+porta\b': 'Fique à vontade.',
-        r'pegar\s+a\s+buzina\s+de\s+alguém': 'pegar o chifre de alguém',
-        r'véi\s+de\s+puta': 'filho da puta',
-    }
-    texto_corrigido = texto_traduzido
-    for padrao_errado, correcao in REGRAS_CORRECAO_CONTEXTUAL.items():
-        texto_corrigido = re.sub(padrao_errado, correcao, texto_corrigido, flags=re.IGNORECASE)
-    return texto_corrigido
+    resultado = {}
+    pendentes = []
+    for texto in dict.fromkeys(textos):
+        traducao = MEMORIA.obter(texto)
+        if traducao is None:
+            pendentes.append(texto)
+        else:
+            resultado[texto] = traducao
+    if not pendentes:
+        return resultado
 
-def aplicar_adaptacao_ptbr(texto_traduzido, formalidade):
+    adiados = []
+    if MEMORIA.indice_aproximado is not None and len(pendentes) > 1:
+        pendentes, adiados = separar_quase_repetidos(pendentes, MEMORIA.indice_aproximado.limiar)
+    _enviar_ao_modelo(pendentes, resultado, exibir_progresso)
+    if adiados:
+        restantes = []
+        for texto in adiados:
+            traducao = MEMORIA.obter_aproximado(texto)
+            if traducao is None:
+                restantes.append(texto)
+            else:
+                resultado[texto] = traducao
+        if restantes:
+            _enviar_ao_modelo(restantes, resultado, exibir_progresso)
+    return resultado
+
+def separar_quase_repetidos(textos, limiar):
     """
-    Adapta o texto ao nível de formalidade detectado (formal ou informal/gírias).
+    Divide os textos em (representantes, adiados): um texto é adiado quando difere
+    de um representante só no que adaptar_traducao() sabe ajustar.
     """
-    if formalidade == 'neutro':
-        return texto_traduzido
+    representantes = IndiceAproximado(limiar)
+    escolhidos, adiados = [], []
+    for texto in textos:
+        if representantes.buscar(texto) is not None:
+            adiados.append(texto)
+        else:
+            representantes.adicionar(texto, texto)
+            escolhidos.append(texto)
+    return escolhidos, adiados
 
-    regras_formais = {
-        'você': 'o senhor/a senhora', 'vocês': 'os senhores/as senhoras', 'te': 'lhe',
-        'seu': 'seu/sua', 'a gente': 'nós', 'meu': 'meu/minha', 'ajudar': 'auxiliar',
-        'precisa': 'necessita', 'conseguir': 'obter', 'pedir': 'solicitar', 'mostrar': 'demonstrar',
-        'usar': 'utilizar', 'começar': 'iniciar', 'terminar': 'finalizar', 'dar': 'fornecer',
-        'falar': 'comunicar', 'entender': 'compreender', 'ir': 'dirigir-se', 'mandar': 'enviar',
-        'querer': 'desejar', 'ver': 'observar', 'dizer': 'declarar', 'achar': 'considerar',
-        'confirmar': 'ratificar', 'explicar': 'elucidar', 'morar': 'residir', 'comprar': 'adquirir',
-        'pedir desculpas': 'apresentar escusas', 'ajuda': 'auxílio', 'obrigado': 'grato',
-        'obrigada': 'grata', 'desculpe': 'lamento', 'coisa': 'questão', 'mas': 'porém',
-        'então': 'portanto', 'muito': 'sobremaneira', 'casa': 'residência', 'fim': 'término',
-        'conversa': 'diálogo', 'dono': 'proprietário', 'também': 'outrossim',
-        'por isso': 'destarte', 'chefe': 'superior'
-    }
+def formatar_duracao(segundos):
+    """Formata uma duração em segundos como '1h02m', '3m05s' ou '42s'."""
+    segundos = int(round(segundos))
+    horas, resto = divmod(segundos, 3600)
+    minutos, segundos = divmod(resto, 60)
+    if horas:
+        return f"{horas}h{minutos:02d}m"
+    if minutos:
+        return f"{minutos}m{segundos:02d}s"
+    return f"{segundos}s"
 
-    regras_informais = {
-        'você': 'cê', 'está': 'tá', 'estou': 'tô', 'estamos': 'tamo', 'para': 'pra', 'para o': 'pro',
-        'para a': 'pra', 'qual é': 'qualé', 'com o': 'co', 'com a': 'ca', 'dinheiro': 'grana',
-        'trabalho': 'trampo', 'trabalhar': 'trampar', 'legal': 'daora', 'bom': 'massa',
-        'muito bom': 'show de bola', 'problema': 'B.O.', 'cara': 'véi', 'amigo': 'parça',
-        'entende': 'tá ligado', 'entendeu': 'sacou', 'com certeza': 'demorô', 'garota': 'mina',
-        'garoto': 'mano', 'rápido': 'ligeiro', 'entendi': 'saquei', 'vamos embora': 'bora',
-        'festa': 'rolê', 'combinado': 'fechou', 'confusão': 'treta', 'conversa': 'papo',
-        'espera aí': 'péra', 'mesmo': 'mermo', 'tipo': 'tipo assim', 'de boa': 'sussa',
-        'ótimo': 'top', 'se talvez': 'se pá', 'complicado': 'tenso', 'não aguento': 'não tanko',
-        'pessoa chata': 'cringe'
-    }
+class EstimativaTempo:
+    """
+    Acompanha o progresso de um trabalho de `total` segmentos e estima o tempo
+    restante pela taxa medida (segmentos/s) desde o início. Uma taxa que cai sem
+    parar entre duas atualizações é o sinal de um travamento.
+    """
+
+    def __init__(self, total):
+        self.total = total
+        self.feitos = 0
+        self.inicio = time.perf_counter()
+
+    def avancar(self, quantidade):
+        self.feitos += quantidade
+
+    def taxa(self):
+        decorrido = time.perf_counter() - self.inicio
+        return self.feitos / decorrido if decorrido > 0 else 0.0
+
+    def descrever(self):
+        """Texto curto com a taxa e o tempo restante, para as linhas de progresso."""
+        taxa = self.taxa()
+        if not self.feitos or taxa <= 0:
+            return "estimando..."
+        restante = max(0, self.total - self.feitos) / taxa
+        return f"{taxa:.1f} seg/s, faltam ~{formatar_duracao(restante)}"
+
+def _enviar_ao_modelo(pendentes, resultado, exibir_progresso):
+    """Envia os textos ao modelo em lotes, guardando as traduções na memória e em `resultado`."""
+    # Ordenar por tamanho agrupa textos parecidos e reduz o preenchimento (padding) do lote.
+    pendentes.sort(key=len)
+    tamanho_lote = max(1, CONFIGURACAO['tamanho_lote'])
+    traduzir_varios = getattr(TRADUTOR, 'traduzir_lote', None)
+    estimativa = EstimativaTempo(len(pendentes))
+    if exibir_progresso:
+        print(f"[*] Enviando {len(pendentes)} segmentos únicos ao modelo em lotes de {tamanho_lote}...")
+    for inicio in range(0, len(pendentes), tamanho_lote):
+        lote = pendentes[inicio:inicio + tamanho_lote]
+        inicio_chamada = time.perf_counter()
+        try:
+            if traduzir_varios is not None:
+                traducoes = traduzir_varios(lote)
+            else:
+                traducoes = [TRADUTOR.translate(texto) for texto in lote]
+        except TimeoutError as e:
+            # Sem reenvio um a um: o servidor ainda está ocupado com este lote.
+            print(f"\n⚠️  Erro ao traduzir um lote ({e}). O lote não é reenviado.")
+            traducoes = [None] * len(lote)
+        except Exception as e:
+            print(f"\n⚠️  Erro ao traduzir um lote ({e}). Traduzindo os segmentos um a um.")
+            traducoes = []
+            for texto in lote:
+                try:
+                    traducoes.append(TRADUTOR.translate(texto))
+                except Exception as e_item:
+                    print(f"⚠️  Erro ao traduzir o texto '{texto[:50]}...': {e_item}")
+                    traducoes.append(None)
+        if PERFIL is not None:
+            PERFIL.registrar_chamada_modelo(time.perf_counter() - inicio_chamada, len(lote))
+        for texto, traducao in zip(lote, traducoes):
+            if traducao is not None:
+                MEMORIA.guardar(texto, traducao)
+                resultado[texto] = traducao
+        estimativa.avancar(len(lote))
+        if exibir_progresso:
+            print(f"    -> Lotes: {estimativa.feitos}/{len(pendentes)} segmentos ({estimativa.descrever()})   ", end='\r')
+    if exibir_progresso:
+        print()
+
+def pretraduzir(textos_originais):
+    """
+    Coleta as unidades de tradução de vários blocos de texto e as traduz em lote,
+    deixando-as na memória de tradução. Depois disso, processar_paragrafo_completo()
+    encontra cada fragmento no cache e não chama mais o modelo individualmente.
+    """
+    with medir_etapa('pretraducao_lote'):
+        _pretraduzir(textos_originais)
 
-    regras = regras_formais if formalidade == 'formal' else regras_informais
-    def substituir(match):
+def _pretraduzir(textos_originais):
+    unidades = []
+    for texto in textos_originais:
+        unidades.extend(extrair_unidades_traducao(texto))
+    if not unidades:
+        return
+    traducoes = traduzir_lote(unidades)
+
+    if CONFIGURACAO['protecao'] != 'mascara':
+        return
+    # Linhas cujo marcador se perdeu serão traduzidas por divisão: adianta esses fragmentos também.
+    unidades_divisao = []
+    for texto in dict.fromkeys(textos_originais):
+        if not texto or not RE_CODIGO_RENPY.search(texto):
+            continue
+        mascara = mascarar_codigo(texto)
+        if mascara is None:
+            continue
+        traducao = juntar_frases(segmentar_frases(mascara[0].strip()), traducoes)
+        if traducao is not None and restaurar_codigo(traducao, mascara[1]) is None:
+            unidades_divisao.extend(extrair_unidades_traducao(texto, dividir=True))
+    if unidades_divisao:
+        traduzir_lote(unidades_divisao)
+
+PONTUACAO_FORMALIDADE = {
+    'sincerely': 5, 'yours faithfully': 5, 'to whom it may concern': 5, 'regards': 4,
+    'esteemed': 4, 'mr.': 3, 'mrs.': 3, 'ms.': 3, 'madam': 4, 'sir': 4, 'furthermore': 3,
+    'consequently': 3, 'nevertheless': 3, 'henceforth': 3, 'therefore': 2, 'additionally': 2,
+    'moreover': 2, 'subsequently': 2, 'thus': 2, 'inquire': 3, 'procure': 3, 'endeavor': 3,
+    'commence': 2, 'facilitate': 2, 'ascertain': 2, 'request': 1, 'require': 1, 'assistance': 2,
+    'clarification': 2, 'gratitude': 2, 'opportunity': 1, 'documentation': 2, 'pertaining': 2,
+    'shall': 2, 'kindly': 1, 'lmao': -5, 'rofl': -5, 'omg': -4, 'btw': -3, 'fyi': -3, 'imo': -3,
+    'lol': -3, 'ain\'t': -4, 'cuz': -3, 'gonna': -2, 'wanna': -2, 'gotta': -2, 'dunno': -2,
+    'lemme': -2, 'gimme': -2, 'can\'t': -1, 'don\'t': -1, 'won\'t': -1, 'i\'m': -1, 'you\'re': -1,
+    'dude': -3, 'bro': -3, 'yo': -3, 'sup': -3, 'what\'s up': -3, 'my bad': -3, 'for real': -2,
+    'no worries': -2, 'hang out': -2, 'chill': -2, 'awesome': -2, 'dope': -2, 'sick': -2,
+    'lit': -2, 'cool': -1, 'man': -2, 'buddy': -2, 'pal': -2, 'folks': -1, 'hey': -1,
+    'yeah': -1, 'yep': -1
+}
+LIMIAR_NEUTRO_FORMALIDADE = 3
+
+def compilar_pontuador_formalidade(pontuacao):
+    """
+    Junta todos os termos de formalidade em uma única expressão regular, com os
+    termos mais longos primeiro. Cada termo mantém as mesmas bordas de palavra
+    que teria sozinho, então um único finditer() conta as mesmas ocorrências que
+    uma busca por termo. (Isso vale enquanto nenhum termo contiver outro inteiro
+    nem se sobrepuser a ele, o que é o caso da tabela acima.)
+    """
+    termos = sorted(pontuacao, key=len, reverse=True)
+    return re.compile(r'\b(?:' + '|'.join(re.escape(termo) for termo in termos) + r')\b')
+
+RE_FORMALIDADE = compilar_pontuador_formalidade(PONTUACAO_FORMALIDADE)
+
+def classificar_formalidade(pontuacao_total):
+    """Converte a pontuação de formalidade em 'formal', 'informal' ou 'neutro'."""
+    if pontuacao_total > LIMIAR_NEUTRO_FORMALIDADE:
+        return 'formal'
+    elif pontuacao_total < -LIMIAR_NEUTRO_FORMALIDADE:
+        return 'informal'
+    else:
+        return 'neutro'
+
+def detectar_formalidade_ingles(texto):
+    """
+    Analisa o texto em inglês usando um sistema de pontuação ponderada para
+    determinar o tom com alta precisão. Faz uma única passada sobre o texto.
+    """
+    pontuacao_total = sum(PONTUACAO_FORMALIDADE[m.group(0)] for m in RE_FORMALIDADE.finditer(texto.lower()))
+    return classificar_formalidade(pontuacao_total)
+
+# --- Regras de Pós-Processamento (pt-BR) ---
+# Estas são as regras padrão. Arquivos JSON em --regras PASTA acrescentam ou
+# substituem regras (ver carregar_regras_externas()).
+
+REGRAS_CORRECAO_CONTEXTUAL = {
+    r'\b(eu\s+congelo|tô\s+congelando)\b': 'Eu paro',
+    r'\bfazem\s+uma\s+abelha\b': 'vão direto',
+    r'\b(em\s+sua\s+mãe|na\s+sua\s+mãe)\b': 'na boca dele',
+    r'\bcolocando\s+o\s+bolo\s+em\s+sua\s+mãe\b': 'colocando o bolo na boca',
+    r'\bgarras\s+copulam\b': 'garras perfuram',
+    r'Quieres\s+peloar!\s+Sem\s+mim\s+jodas!': 'Quer brigar! Não fode comigo!',
+    r'\bnão\s+na\s+véi\b': 'no rosto não, cara!',
+    r'\bpode\s+tocar\s+na\s+minha\s+porta\b': 'Fique à vontade.',
+    r'pegar\s+a\s+buzina\s+de\s+alguém': 'pegar o chifre de alguém',
+    r'véi\s+de\s+puta': 'filho da puta',
+}
+
+REGRAS_FORMAIS = {
+    'você': 'o senhor/a senhora', 'vocês': 'os senhores/as senhoras', 'te': 'lhe',
+    'seu': 'seu/sua', 'a gente': 'nós', 'meu': 'meu/minha', 'ajudar': 'auxiliar',
+    'precisa': 'necessita', 'conseguir': 'obter', 'pedir': 'solicitar', 'mostrar': 'demonstrar',
+    'usar': 'utilizar', 'começar': 'iniciar', 'terminar': 'finalizar', 'dar': 'fornecer',
+    'falar': 'comunicar', 'entender': 'compreender', 'ir': 'dirigir-se', 'mandar': 'enviar',
+    'querer': 'desejar', 'ver': 'observar', 'dizer': 'declarar', 'achar': 'considerar',
+    'confirmar': 'ratificar', 'explicar': 'elucidar', 'morar': 'residir', 'comprar': 'adquirir',
+    'pedir desculpas': 'apresentar escusas', 'ajuda': 'auxílio', 'obrigado': 'grato',
+    'obrigada': 'grata', 'desculpe': 'lamento', 'coisa': 'questão', 'mas': 'porém',
+    'então': 'portanto', 'muito': 'sobremaneira', 'casa': 'residência', 'fim': 'término',
+    'conversa': 'diálogo', 'dono': 'proprietário', 'também': 'outrossim',
+    'por isso': 'destarte', 'chefe': 'superior'
+}
+
+REGRAS_INFORMAIS = {
+    'você': 'cê', 'está': 'tá', 'estou': 'tô', 'estamos': 'tamo', 'para': 'pra', 'para o': 'pro',
+    'para a': 'pra', 'qual é': 'qualé', 'com o': 'co', 'com a': 'ca', 'dinheiro': 'grana',
+    'trabalho': 'trampo', 'trabalhar': 'trampar', 'legal': 'daora', 'bom': 'massa',
+    'muito bom': 'show de bola', 'problema': 'B.O.', 'cara': 'véi', 'amigo': 'parça',
+    'entende': 'tá ligado', 'entendeu': 'sacou', 'com certeza': 'demorô', 'garota': 'mina',
+    'garoto': 'mano', 'rápido': 'ligeiro', 'entendi': 'saquei', 'vamos embora': 'bora',
+    'festa': 'rolê', 'combinado': 'fechou', 'confusão': 'treta', 'conversa': 'papo',
+    'espera aí': 'péra', 'mesmo': 'mermo', 'tipo': 'tipo assim', 'de boa': 'sussa',
+    'ótimo': 'top', 'se talvez': 'se pá', 'complicado': 'tenso', 'não aguento': 'não tanko',
+    'pessoa chata': 'cringe'
+}
+
+# Nome do conjunto -> (tabela padrão, arquivo externo, regras são regex?)
+CONJUNTOS_REGRAS = {
+    'correcoes': (REGRAS_CORRECAO_CONTEXTUAL, 'correcoes_contextuais.json', True),
+    'formal': (REGRAS_FORMAIS, 'regras_formais.json', False),
+    'informal': (REGRAS_INFORMAIS, 'regras_informais.json', False),
+}
+
+# Referência a um grupo pelo número dentro do próprio padrão.
+RE_REFERENCIA_NUMERADA = re.compile(r'\\[1-9]|\(\?\(\d')
+
+class ConjuntoRegras:
+    """
+    Um conjunto de regras de substituição compilado uma única vez em uma só
+    expressão regular, aplicado ao texto em uma única passada.
+
+    - Regras literais (formal/informal): palavras ou expressões inteiras, sem
+      diferenciar maiúsculas; a substituição imita a caixa do trecho encontrado.
+    - Regras regex (correções): cada padrão vira uma alternativa nomeada; no
+      mesmo ponto do texto vence a regra que aparece primeiro na tabela. Padrões
+      com referências numeradas (\\1, (?(1)...)) mudariam de número dentro da
+      alternância, então são aplicados sozinhos, na sua posição da tabela.
+    """
+
+    def __init__(self, regras, regex=False):
+        self.regras = dict(regras)
+        self.regex = regex
+        self._padroes_individuais = []
+        self._etapas = []
+        self._padrao = None
+        if not self.regras:
+            return
+        if regex:
+            self._padroes_individuais = [
+                (re.compile(padrao, re.IGNORECASE), substituicao) for padrao, substituicao in self.regras.items()
+            ]
+            bloco = []
+            for i, padrao in enumerate(self.regras):
+                if RE_REFERENCIA_NUMERADA.search(padrao):
+                    self._fechar_bloco(bloco)
+                    self._etapas.append(self._padroes_individuais[i])
+                else:
+                    bloco.append(i)
+            self._fechar_bloco(bloco)
+        else:
+            self._regras_minusculas = {chave.lower(): valor for chave, valor in self.regras.items()}
+            chaves_ordenadas = sorted(self.regras.keys(), key=len, reverse=True)
+            self._padrao = re.compile(
+                r'\b(' + '|'.join(re.escape(chave) for chave in chaves_ordenadas) + r')\b', re.IGNORECASE
+            )
+
+    def _fechar_bloco(self, bloco):
+        """Junta as regras do bloco em uma só etapa (uma alternância), esvaziando o bloco."""
+        if not bloco:
+            return
+        alternativas = '|'.join(f'(?P<_r{i}>{self._padroes_individuais[i][0].pattern})' for i in bloco)
+        try:
+            self._etapas.append((re.compile(alternativas, re.IGNORECASE), self._substituir_regex))
+        except re.error:
+            # Algum padrão não pode ser combinado (ex.: flags no meio); aplica um a um.
+            self._etapas.extend(self._padroes_individuais[i] for i in bloco)
+        bloco.clear()
+
+    def _substituir_literal(self, match):
         palavra_encontrada = match.group(0)
-        substituta = regras.get(palavra_encontrada.lower())
+        substituta = self._regras_minusculas.get(palavra_encontrada.lower())
         if not substituta: return palavra_encontrada
         if palavra_encontrada.isupper(): return substituta.upper()
         if palavra_encontrada.istitle(): return substituta.capitalize()
         return substituta
-    chaves_ordenadas = sorted(regras.keys(), key=len, reverse=True)
-    padrao = re.compile(r'\b(' + '|'.join(re.escape(key) for key in chaves_ordenadas) + r')\b', re.IGNORECASE)
-    return padrao.sub(substituir, texto_traduzido)
+
+    def _substituir_regex(self, match):
+        padrao, substituicao = self._padroes_individuais[int(match.lastgroup[2:])]
+        # Reaplica a regra individual na mesma posição do texto original, para que
+        # lookarounds, âncoras e referências como \1 vejam o mesmo contexto.
+        individual = padrao.match(match.string, match.start())
+        if individual is None:
+            return match.group(0)
+        return individual.expand(substituicao)
+
+    def aplicar(self, texto):
+        if not self.regras:
+            return texto
+        if not self.regex:
+            return self._padrao.sub(self._substituir_literal, texto)
+        for padrao, substituicao in self._etapas:
+            texto = padrao.sub(substituicao, texto)
+        return texto
+
+_CONJUNTOS_COMPILADOS = {}
+
+def carregar_regras_externas(nome):
+    """
+    Retorna as regras do conjunto `nome`: a tabela padrão, atualizada com o
+    arquivo JSON correspondente em CONFIGURACAO['pasta_regras'], se existir.
+    """
+    regras_padrao, nome_arquivo, _ = CONJUNTOS_REGRAS[nome]
+    regras = dict(regras_padrao)
+    pasta = CONFIGURACAO['pasta_regras']
+    if not pasta:
+        return regras
+    caminho = os.path.join(pasta, nome_arquivo)
+    if not os.path.isfile(caminho):
+        return regras
+    try:
+        with open(caminho, 'r', encoding='utf-8') as f:
+            regras_arquivo = json.load(f)
+        if not isinstance(regras_arquivo, dict):
+            raise ValueError("o arquivo deve conter um objeto JSON {\"padrão\": \"substituição\"}")
+        regras.update(regras_arquivo)
+    except (OSError, ValueError) as e:
+        print(f"⚠️  Aviso: Não foi possível carregar as regras de '{caminho}': {e}")
+    return regras
+
+def obter_conjunto_regras(nome):
+    """Retorna o conjunto de regras `nome` compilado, compilando-o na primeira vez."""
+    conjunto = _CONJUNTOS_COMPILADOS.get(nome)
+    if conjunto is None:
+        conjunto = ConjuntoRegras(carregar_regras_externas(nome), regex=CONJUNTOS_REGRAS[nome][2])
+        _CONJUNTOS_COMPILADOS[nome] = conjunto
+    return conjunto
+
+def aplicar_correcoes_contextuais_ptbr(texto_traduzido):
+    """
+    Aplica um conjunto de regras de substituição para corrigir traduções literais
+    e outros erros comuns.
+    """
+    return obter_conjunto_regras('correcoes').aplicar(texto_traduzido)
+
+def aplicar_adaptacao_ptbr(texto_traduzido, formalidade):
+    """
+    Adapta o texto ao nível de formalidade detectado (formal ou informal/gírias).
+    """
+    if formalidade == 'neutro':
+        return texto_traduzido
+    return obter_conjunto_regras(formalidade).aplicar(texto_traduzido)
+
+# --- Pipeline de Tradução ---
 
 def processar_paragrafo_completo(texto_original):
     """
     Pipeline completo de tradução para um bloco de texto:
     1. Traduz (protegendo código) -> 2. Corrige -> 3. Detecta formalidade -> 4. Adapta.
+    As etapas 2 a 4 só se aplicam aos destinos pt-BR (DESTINOS_COM_REGRAS_PTBR).
     """
     if not texto_original or not texto_original.strip():
         return ""
     
+    if PERFIL is not None:
+        PERFIL.registrar_segmento(texto_original)
+
     # Usa a nova função com proteção aprimorada
-    traducao_base = traduzir_com_protecao_de_codigo(texto_original)
-    traducao_corrigida = aplicar_correcoes_contextuais_ptbr(traducao_base)
-    formalidade = detectar_formalidade_ingles(texto_original)
-    traducao_final = aplicar_adaptacao_ptbr(traducao_corrigida, formalidade)
+    with medir_etapa('traducao_com_protecao'):
+        traducao_base = traduzir_com_protecao_de_codigo(texto_original)
+    if DESTINO_ATUAL not in DESTINOS_COM_REGRAS_PTBR:
+        # As correções e a adaptação de formalidade são específicas do pt-BR.
+        return traducao_base
+    with medir_etapa('correcoes_contextuais'):
+        traducao_corrigida = aplicar_correcoes_contextuais_ptbr(traducao_base)
+    with medir_etapa('deteccao_formalidade'):
+        formalidade = detectar_formalidade_ingles(texto_original)
+    with medir_etapa('adaptacao_ptbr'):
+        traducao_final = aplicar_adaptacao_ptbr(traducao_corrigida, formalidade)
     
     return traducao_final
 
 # --- MODO DE TRADUÇÃO: REN'PY (.rpy) ---
 
-def processar_arquivo_rpy(caminho_arquivo):
-    """Lógica de tradução para um único arquivo .rpy com todas as correções."""
-    print(f"\n📄 Processando: {os.path.basename(caminho_arquivo)}")
+# Uma linha a ser preenchida: índice da linha vazia, tipo do bloco, o que vem antes
+# e depois das aspas na linha traduzida, e o texto original em inglês.
+SlotRpy = namedtuple('SlotRpy', 'linha tipo prefixo texto sufixo')
+
+RE_OLD = re.compile(r'^\s*old\s*"(?P<texto>.+?)"\s*$')
+RE_NEW_VAZIO = re.compile(r'^(?P<indent>\s*new\s*)""\s*$')
+RE_DIALOGO_COMENTADO = re.compile(r'^\s*#\s*(?P<prefixo>.+?)\s+"(?P<texto>.+?)"\s*$')
+RE_DIALOGO_VAZIO = re.compile(r'^(?P<indent>\s*)(?P<prefixo>.+?)\s+""\s*$')
+RE_NARRACAO_COMENTADA = re.compile(r'^\s*#\s*"(?P<texto>.+?)"(?P<resto>.*)$')
+RE_NARRACAO_VAZIA = re.compile(r'^(?P<indent>\s*)""(?P<resto>.*)$')
+
+def classificar_par_rpy(linha_atual, proxima_linha, indice_proxima):
+    """
+    Verifica se (linha_atual, proxima_linha) é um par "original comentado / linha
+    vazia" e retorna o SlotRpy correspondente, ou None.
+
+    Um filtro barato vem antes das expressões regulares: a linha original precisa
+    começar com 'old' ou '#' e a próxima precisa conter '""'. A maior parte das
+    linhas de código é descartada aí, sem chegar a nenhum regex.
+    """
+    primeiro = linha_atual.lstrip()[:1]
+    if (primeiro != 'o' and primeiro != '#') or '""' not in proxima_linha:
+        return None
+
+    if primeiro == 'o':
+        m_old = RE_OLD.match(linha_atual)
+        m_new = RE_NEW_VAZIO.match(proxima_linha)
+        if m_old and m_new:
+            return SlotRpy(indice_proxima, 'old', m_new.group('indent'), m_old.group('texto'), '')
+        return None
+
+    m_com_diag = RE_DIALOGO_COMENTADO.match(linha_atual)
+    m_vazio_diag = RE_DIALOGO_VAZIO.match(proxima_linha) if m_com_diag else None
+    if m_com_diag and m_vazio_diag:
+        prefixo_comentado = m_com_diag.group('prefixo').split()
+        prefixo_vazio = m_vazio_diag.group('prefixo')
+        # Uma linha '""' também casa com RE_DIALOGO_VAZIO, mas com prefixo só de espaços.
+        if prefixo_vazio.split()[:1] == prefixo_comentado[:1]:
+            return SlotRpy(indice_proxima, 'dialogo', f'{m_vazio_diag.group("indent")}{prefixo_vazio} ',
+                           m_com_diag.group('texto'), '')
+        return None
+
+    m_com_narr = RE_NARRACAO_COMENTADA.match(linha_atual)
+    m_vazio_narr = RE_NARRACAO_VAZIA.match(proxima_linha) if m_com_narr else None
+    if m_com_narr and m_vazio_narr and m_com_narr.group('resto').strip() == m_vazio_narr.group('resto').strip():
+        return SlotRpy(indice_proxima, 'narracao', m_vazio_narr.group('indent'),
+                       m_com_narr.group('texto'), m_vazio_narr.group('resto'))
+    return None
+
+def iterar_slots_rpy(linhas):
+    """
+    Percorre as linhas de um arquivo .rpy (lista ou arquivo aberto) com uma janela
+    de duas linhas e gera um SlotRpy para cada par que precisa de tradução.
+    Depois de um par encontrado, a linha vazia não é reaproveitada como original.
+    """
+    linha_anterior = None
+    for indice, linha in enumerate(linhas):
+        if linha_anterior is not None:
+            slot = classificar_par_rpy(linha_anterior, linha, indice)
+            if slot is not None:
+                yield slot
+                linha_anterior = None
+                continue
+        linha_anterior = linha
+
+def coletar_slots_rpy(linhas):
+    """Retorna a lista de SlotRpy das linhas de um arquivo .rpy."""
+    return list(iterar_slots_rpy(linhas))
+
+def coletar_slots_arquivo_rpy(caminho_arquivo):
+    """Lê um arquivo .rpy em streaming e retorna seus SlotRpy, ou None em caso de erro."""
     try:
         with open(caminho_arquivo, 'r', encoding='utf-8') as f:
-            linhas = f.readlines()
+            return coletar_slots_rpy(f)
     except Exception as e:
         print(f"❌ Erro ao ler o arquivo: {e}")
-        return 0
-
-    RE_OLD = re.compile(r'^\s*old\s*"(?P<texto>.+?)"\s*$')
-    RE_NEW_VAZIO = re.compile(r'^(?P<indent>\s*new\s*)""\s*$')
-    RE_DIALOGO_COMENTADO = re.compile(r'^\s*#\s*(?P<prefixo>.+?)\s+"(?P<texto>.+?)"\s*$')
-    RE_DIALOGO_VAZIO = re.compile(r'^(?P<indent>\s*)(?P<prefixo>.+?)\s+""\s*$')
-    RE_NARRACAO_COMENTADA = re.compile(r'^\s*#\s*"(?P<texto>.+?)"(?P<resto>.*)$')
-    RE_NARRACAO_VAZIA = re.compile(r'^(?P<indent>\s*)""(?P<resto>.*)$')
-
-    novas_linhas = []
-    traducoes_feitas = 0
-    i = 0
-    total_linhas = len(linhas)
-
-    while i < total_linhas:
-        linha_atual = linhas[i]
-        proxima_linha = linhas[i + 1] if i + 1 < total_linhas else None
-        traduziu_bloco = False
-
-        if proxima_linha:
-            texto_original = None
-            linha_traduzida_formatada = None
-
-            m_old = RE_OLD.match(linha_atual)
-            m_new = RE_NEW_VAZIO.match(proxima_linha)
-            m_com_diag = RE_DIALOGO_COMENTADO.match(linha_atual)
-            m_vazio_diag = RE_DIALOGO_VAZIO.match(proxima_linha)
-            m_com_narr = RE_NARRACAO_COMENTADA.match(linha_atual)
-            m_vazio_narr = RE_NARRACAO_VAZIA.match(proxima_linha)
-
-            if m_old and m_new:
-                texto_original = m_old.group('texto')
-                traducao_final = processar_paragrafo_completo(texto_original)
-                linha_traduzida_formatada = f'{m_new.group("indent")}"{traducao_final}"\n'
-
-            elif m_com_diag and m_vazio_diag:
-                prefixo_comentado = m_com_diag.group('prefixo')
-                prefixo_vazio = m_vazio_diag.group('prefixo')
-                if prefixo_comentado.split()[0] == prefixo_vazio.split()[0]:
-                    texto_original = m_com_diag.group('texto')
-                    traducao_final = processar_paragrafo_completo(texto_original)
-                    linha_traduzida_formatada = f'{m_vazio_diag.group("indent")}{prefixo_vazio} "{traducao_final}"\n'
-            
-            elif m_com_narr and m_vazio_narr and m_com_narr.group('resto').strip() == m_vazio_narr.group('resto').strip():
-                texto_original = m_com_narr.group('texto')
-                traducao_final = processar_paragrafo_completo(texto_original)
-                linha_traduzida_formatada = f'{m_vazio_narr.group("indent")}"{traducao_final}"{m_vazio_narr.group("resto")}\n'
-            
-            if texto_original is not None and linha_traduzida_formatada is not None:
-                novas_linhas.extend([linha_atual, linha_traduzida_formatada])
-                traducoes_feitas += 1
-                i += 2
-                traduziu_bloco = True
-
-        if not traduziu_bloco:
-            novas_linhas.append(linha_atual)
-            i += 1
+        return None
+
+RE_NEW_PREENCHIDO = re.compile(r'^\s*new\s*"(?P<texto>.+)"\s*$')
+RE_DIALOGO_PREENCHIDO = re.compile(r'^\s*(?P<prefixo>[^#"\s][^"]*?)\s+"(?P<texto>.+)"\s*$')
+RE_NARRACAO_PREENCHIDA = re.compile(r'^\s*"(?P<texto>.+)"(?P<resto>.*)$')
 
+def iterar_pares_traduzidos_rpy(linhas):
+    """
+    Gera (original, tradução) para cada par "original comentado / linha já
+    traduzida" de um arquivo .rpy (o inverso dos slots de iterar_slots_rpy()).
+    """
+    linha_anterior = None
+    for linha in linhas:
+        if linha_anterior is not None and '""' not in linha:
+            par = None
+            m_old = RE_OLD.match(linha_anterior)
+            if m_old:
+                m_new = RE_NEW_PREENCHIDO.match(linha)
+                if m_new:
+                    par = (m_old.group('texto'), m_new.group('texto'))
+            else:
+                m_com_diag = RE_DIALOGO_COMENTADO.match(linha_anterior)
+                m_diag = RE_DIALOGO_PREENCHIDO.match(linha) if m_com_diag else None
+                if m_diag and m_diag.group('prefixo').split()[:1] == m_com_diag.group('prefixo').split()[:1]:
+                    par = (m_com_diag.group('texto'), m_diag.group('texto'))
+                m_com_narr = RE_NARRACAO_COMENTADA.match(linha_anterior) if par is None else None
+                m_narr = RE_NARRACAO_PREENCHIDA.match(linha) if m_com_narr else None
+                if m_narr and m_com_narr.group('resto').strip() == m_narr.group('resto').strip():
+                    par = (m_com_narr.group('texto'), m_narr.group('texto'))
+            if par is not None and par[0] != par[1]:
+                yield par
+                linha_anterior = None
+                continue
+        linha_anterior = linha
+
+def mascarar_par_traduzido(original, traducao):
+    """
+    Converte um par traduzido em (unidade, tradução) com as chaves usadas pela
+    memória: o código Ren'Py vira os mesmos marcadores ZXQn nos dois lados.
+    Retorna None se o par não corresponder a uma única unidade de tradução.
+    """
+    if not RE_CODIGO_RENPY.search(original):
+        unidade = original
+    else:
+        mascara = mascarar_codigo(original) if CONFIGURACAO['protecao'] == 'mascara' else None
+        if mascara is None:
+            return None
+        unidade, codigos = mascara
+        indices = {}
+        for i, codigo in enumerate(codigos):
+            indices.setdefault(codigo.texto, []).append(i)
+        faltando = [False]
+        def indice_do_codigo(codigo):
+            fila = indices.get(codigo)
+            if not fila:
+                faltando[0] = True
+                return None
+            return fila.pop(0)
+        traducao = trocar_codigos_por_marcadores(traducao, indice_do_codigo)[0]
+        if faltando[0] or any(indices.values()):
+            return None
+    unidade = unidade.strip()
+    if not unidade or len(segmentar_frases(unidade)) > 1:
+        return None
+    return normalizar_texto(unidade), normalizar_texto(traducao)
+
+def carregar_pares_rpy(pasta):
+    """Lê os pares já traduzidos (por pessoas ou pelo script) de todos os .rpy de uma pasta."""
+    pares = []
+    for raiz, _, nomes in os.walk(pasta):
+        for nome in sorted(nomes):
+            if not nome.endswith('.rpy'):
+                continue
+            try:
+                with open(os.path.join(raiz, nome), 'r', encoding='utf-8') as f:
+                    for original, traducao in iterar_pares_traduzidos_rpy(f):
+                        par = mascarar_par_traduzido(original, traducao)
+                        if par is not None:
+                            pares.append(par)
+            except (OSError, UnicodeDecodeError) as e:
+                print(f"⚠️  Aviso: Não foi possível ler '{nome}' para a memória aproximada: {e}")
+    return pares
+
+def criar_backup(caminho_arquivo):
+    """
+    Cria '<arquivo>.bak' como um hardlink para o arquivo atual, o que não copia
+    nenhum dado: como a gravação substitui o arquivo por renomeação, o .bak
+    continua apontando para o conteúdo antigo. Usa cópia se o link não for possível.
+    """
+    caminho_backup = f"{caminho_arquivo}.bak"
+    with contextlib.suppress(FileNotFoundError):
+        os.remove(caminho_backup)
+    try:
+        os.link(caminho_arquivo, caminho_backup)
+    except OSError:
+        shutil.copy2(caminho_arquivo, caminho_backup)
+    return caminho_backup
+
+def _ler_umask():
+    umask = os.umask(0)
+    os.umask(umask)
+    return umask
+
+# Lida uma vez só: os.umask() não tem consulta sem alteração, e trocá-la durante
+# a execução afetaria outras threads.
+UMASK_PROCESSO = _ler_umask()
+
+@contextlib.contextmanager
+def gravacao_atomica(caminho_arquivo, backup=False):
+    """
+    Abre um arquivo temporário na mesma pasta para escrita; ao final, cria o
+    backup (se pedido) e o renomeia por cima do original, de modo que o arquivo
+    nunca fique pela metade em caso de falha.
+    """
+    pasta = os.path.dirname(os.path.abspath(caminho_arquivo))
+    descritor, caminho_temporario = tempfile.mkstemp(
+        prefix=f".{os.path.basename(caminho_arquivo)}.", suffix=".tmp", dir=pasta
+    )
+    try:
+        with os.fdopen(descritor, 'w', encoding='utf-8') as f:
+            yield f
+        if os.path.exists(caminho_arquivo):
+            shutil.copymode(caminho_arquivo, caminho_temporario)
+            if backup:
+                criar_backup(caminho_arquivo)
+        else:
+            # mkstemp cria o temporário com 0600; um arquivo novo ganha o modo normal.
+            os.chmod(caminho_temporario, 0o666 & ~UMASK_PROCESSO)
+        os.replace(caminho_temporario, caminho_arquivo)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.remove(caminho_temporario)
+        raise
+
+def escrever_arquivo_atomico(caminho_arquivo, linhas):
+    """Grava as linhas no arquivo de forma atômica (ver gravacao_atomica())."""
+    with gravacao_atomica(caminho_arquivo) as f:
+        f.writelines(linhas)
+
+def reescrever_rpy(caminho_arquivo, slots, backup=True, traduzir=None, caminho_saida=None, ajustar_linha=None):
+    """
+    Regrava o arquivo .rpy em streaming, preenchendo as linhas dos slots com a
+    tradução. Cada tradução é montada só quando sua linha é alcançada, então a
+    memória usada não cresce com o tamanho do arquivo.
+    `traduzir` recebe o texto original do slot (padrão: processar_paragrafo_completo).
+    Com caminho_saida, grava ali (criando as pastas) em vez de substituir o original;
+    ajustar_linha, se houver, é aplicada às demais linhas.
+    """
+    traduzir = traduzir or processar_paragrafo_completo
+    caminho_saida = caminho_saida or caminho_arquivo
+    if caminho_saida != caminho_arquivo:
+        os.makedirs(os.path.dirname(os.path.abspath(caminho_saida)), exist_ok=True)
+    proximos = iter(slots)
+    slot = next(proximos, None)
+    with open(caminho_arquivo, 'r', encoding='utf-8') as origem, \
+            gravacao_atomica(caminho_saida, backup=backup) as destino:
+        for indice, linha in enumerate(origem):
+            if slot is not None and indice == slot.linha:
+                traducao_final = traduzir(slot.texto)
+                linha = f'{slot.prefixo}"{traducao_final}"{slot.sufixo}\n'
+                slot = next(proximos, None)
+            elif ajustar_linha is not None:
+                linha = ajustar_linha(linha)
+            destino.write(linha)
+
+def processar_arquivo_rpy(caminho_arquivo, pretraduzir_lote=True, slots=None):
+    """
+    Lógica de tradução para um único arquivo .rpy com todas as correções.
+    Com pretraduzir_lote=True, os textos do arquivo são traduzidos em lote antes
+    da escrita; modo_rpy() desliga isso porque já traduziu a pasta inteira.
+    `slots` são os da pré-análise (indexar_arquivos_rpy()); sem eles, o arquivo
+    é lido para coletá-los antes da passada de escrita.
+    Retorna a quantidade de linhas traduzidas, ou None se o arquivo não pôde ser
+    lido ou gravado (e, portanto, não deve ser marcado como concluído).
+    """
+    print(f"\n📄 Processando: {os.path.basename(caminho_arquivo)}")
+    inicio = time.perf_counter()
+    if slots is None:
+        with medir_etapa('leitura_rpy'):
+            slots = coletar_slots_arquivo_rpy(caminho_arquivo)
+        if slots is None:
+            return None
+
+    if pretraduzir_lote:
+        pretraduzir([slot.texto for slot in slots])
+
+    traducoes_feitas = len(slots)
     if traducoes_feitas > 0:
-        caminho_backup = f"{caminho_arquivo}.bak"
-        print(f"   -> {traducoes_feitas} linhas traduzidas. Criando backup: {os.path.basename(caminho_backup)}")
+        backup = CONFIGURACAO['backup']
+        if backup:
+            print(f"   -> {traducoes_feitas} linhas traduzidas. Criando backup: {os.path.basename(caminho_arquivo)}.bak")
+        else:
+            print(f"   -> {traducoes_feitas} linhas traduzidas.")
         try:
-            shutil.copy(caminho_arquivo, caminho_backup)
-            with open(caminho_arquivo, 'w', encoding='utf-8') as f:
-                f.writelines(novas_linhas)
+            with medir_etapa('escrita_rpy'):
+                reescrever_rpy(caminho_arquivo, slots, backup=backup)
         except Exception as e:
             print(f"❌ Erro ao salvar o arquivo ou criar backup: {e}")
+            return None
     else:
         print("   -> Nenhuma tradução necessária neste arquivo.")
+    if PERFIL is not None:
+        PERFIL.registrar_arquivo(caminho_arquivo, time.perf_counter() - inicio, traducoes_feitas)
     return traducoes_feitas
 
+def calcular_hash_arquivo(caminho):
+    """Retorna o SHA-1 do conteúdo de um arquivo."""
+    resumo = hashlib.sha1()
+    with open(caminho, 'rb') as f:
+        for bloco in iter(lambda: f.read(1024 * 1024), b''):
+            resumo.update(bloco)
+    return resumo.hexdigest()
+
+class ManifestoRpy:
+    """
+    Manifesto gravado na pasta do jogo ('.tradutor_manifesto.json') com o hash de
+    conteúdo e a quantidade de linhas pendentes de cada arquivo .rpy, além do
+    plano da execução atual para permitir retomá-la com --retomar.
+    """
+
+    VERSAO = 1
+
+    def __init__(self, diretorio):
+        self.diretorio = diretorio
+        self.caminho = os.path.join(diretorio, NOME_MANIFESTO)
+        self.dados = {'versao': self.VERSAO, 'arquivos': {}, 'execucao': None}
+        if os.path.isfile(self.caminho):
+            try:
+                with open(self.caminho, 'r', encoding='utf-8') as f:
+                    dados = json.load(f)
+                if dados.get('versao') == self.VERSAO:
+                    self.dados = dados
+            except (OSError, ValueError) as e:
+                print(f"⚠️  Aviso: Manifesto ilegível ({e}). Todos os arquivos serão verificados.")
+
+    def _relativo(self, caminho_arquivo):
+        return os.path.relpath(caminho_arquivo, self.diretorio).replace(os.sep, '/')
+
+    def salvar(self):
+        try:
+            escrever_arquivo_atomico(self.caminho, [json.dumps(self.dados, ensure_ascii=False, indent=1)])
+        except OSError as e:
+            print(f"⚠️  Aviso: Não foi possível gravar o manifesto: {e}")
+
+    def arquivo_concluido(self, caminho_arquivo):
+        """
+        True se o arquivo não mudou desde o registro e não tinha linhas pendentes.
+        Tamanho e data iguais dispensam o hash; se só a data mudou, o hash decide.
+        """
+        registro = self.dados['arquivos'].get(self._relativo(caminho_arquivo))
+        if not registro or registro.get('pendentes') != 0:
+            return False
+        try:
+            info = os.stat(caminho_arquivo)
+        except OSError:
+            return False
+        if info.st_size != registro.get('tamanho'):
+            return False
+        if info.st_mtime_ns == registro.get('mtime_ns'):
+            return True
+        if calcular_hash_arquivo(caminho_arquivo) == registro.get('hash'):
+            registro['mtime_ns'] = info.st_mtime_ns
+            return True
+        return False
+
+    def registrar(self, caminho_arquivo, pendentes):
+        """Registra o estado atual do arquivo e a quantidade de linhas pendentes."""
+        try:
+            info = os.stat(caminho_arquivo)
+            self.dados['arquivos'][self._relativo(caminho_arquivo)] = {
+                'hash': calcular_hash_arquivo(caminho_arquivo),
+                'tamanho': info.st_size,
+                'mtime_ns': info.st_mtime_ns,
+                'pendentes': pendentes,
+            }
+        except OSError as e:
+            print(f"⚠️  Aviso: Não foi possível registrar '{caminho_arquivo}' no manifesto: {e}")
+
+    def planejar(self, caminhos_arquivos, retomar=False):
+        """
+        Define quais arquivos serão processados nesta execução e grava o plano.
+        Com retomar=True e uma execução interrompida no manifesto, devolve apenas
+        os arquivos daquele plano que ainda não foram concluídos.
+        """
+        execucao = self.dados.get('execucao')
+        if retomar and execucao:
+            concluidos = set(execucao['concluidos'])
+            restantes = [os.path.join(self.diretorio, *relativo.split('/'))
+                         for relativo in execucao['arquivos'] if relativo not in concluidos]
+            restantes = [caminho for caminho in restantes if os.path.isfile(caminho)]
+            print(f"[*] Retomando execução anterior: {len(concluidos)} arquivos já concluídos, "
+                  f"{len(restantes)} restantes.")
+            return restantes
+        if retomar:
+            print("[*] Nenhuma execução interrompida encontrada no manifesto. Iniciando uma nova.")
+
+        a_processar = [caminho for caminho in caminhos_arquivos if not self.arquivo_concluido(caminho)]
+        ignorados = len(caminhos_arquivos) - len(a_processar)
+        if ignorados:
+            print(f"[*] {ignorados} arquivos inalterados e já traduzidos foram ignorados (manifesto).")
+        self.dados['execucao'] = {
+            'arquivos': [self._relativo(caminho) for caminho in a_processar],
+            'concluidos': [],
+        }
+        self.salvar()
+        return a_processar
+
+    def concluir(self, caminho_arquivo):
+        """Marca o arquivo como concluído nesta execução (checkpoint)."""
+        self.registrar(caminho_arquivo, 0)
+        execucao = self.dados.get('execucao')
+        if execucao is not None:
+            execucao['concluidos'].append(self._relativo(caminho_arquivo))
+        self.salvar()
+
+    def finalizar(self):
+        """Encerra a execução atual: não há mais nada a retomar."""
+        self.dados['execucao'] = None
+        self.salvar()
+
+def _inicializar_trabalhador(configuracao, diretorio, codigo_destino="pb"):
+    """Inicializador de cada processo de trabalho: carrega o modelo uma única vez."""
+    global PERFIL
+    CONFIGURACAO.update(configuracao)
+    if CONFIGURACAO['perfil']:
+        PERFIL = PerfilExecucao()
+    with contextlib.redirect_stdout(io.StringIO()):
+        inicializar_traducao(diretorio, "en", codigo_destino, preparar_pacotes=False)
+
+def _configuracao_trabalhadores(workers):
+    """Cópia de CONFIGURACAO para os processos de trabalho."""
+    configuracao = dict(CONFIGURACAO)
+    # A memória já foi apagada pelo processo principal; os trabalhadores não repetem isso.
+    configuracao['limpar_memoria'] = False
+    if not configuracao['threads_modelo']:
+        # Evita que cada processo tente usar todos os núcleos ao mesmo tempo. Fica
+        # separado de threads_modelo, que guarda só o que foi pedido (--threads-intra).
+        configuracao['threads_trabalhador'] = max(1, (os.cpu_count() or 1) // workers)
+    return configuracao
+
+def _perfil_trabalhador(memoria_antes, memoria_depois):
+    """Extrai o perfil acumulado pelo processo de trabalho (ou None sem --perfil)."""
+    if PERFIL is None:
+        return None
+    for chave in ('consultas', 'acertos_memoria', 'acertos_disco', 'acertos_aproximados', 'falhas'):
+        PERFIL.memoria_trabalhadores[chave] = memoria_depois[chave] - memoria_antes[chave]
+    return PERFIL.extrair_e_zerar()
+
+def _processar_arquivo_trabalhador(caminho_arquivo, slots=None):
+    """
+    Executa processar_arquivo_rpy() em um processo de trabalho. A saída é
+    capturada e devolvida ao processo principal junto com as contagens.
+    """
+    saida = io.StringIO()
+    memoria_antes = MEMORIA.estatisticas()
+    inicio = time.perf_counter()
+    with contextlib.redirect_stdout(saida):
+        traducoes = processar_arquivo_rpy(caminho_arquivo, slots=slots)
+    MEMORIA.gravar_pendentes()
+    memoria_depois = MEMORIA.estatisticas()
+    resultado = {
+        'arquivo': caminho_arquivo,
+        'traducoes': traducoes,
+        'segmentos_modelo': memoria_depois['falhas'] - memoria_antes['falhas'],
+        'segundos': time.perf_counter() - inicio,
+        'saida': saida.getvalue(),
+        'perfil': _perfil_trabalhador(memoria_antes, memoria_depois),
+    }
+    return resultado
+
+def processar_arquivos_em_paralelo(arquivos, diretorio, workers, manifesto=None):
+    """
+    Processa os arquivos .rpy (ArquivoPendente, do maior para o menor, ver
+    indexar_arquivos_rpy()) em um conjunto de processos; começar pelos maiores
+    equilibra a carga. Retorna (total de linhas traduzidas, arquivos com erro).
+    Só os arquivos gravados com sucesso são marcados como concluídos no manifesto.
+    """
+    configuracao = _configuracao_trabalhadores(workers)
+
+    print(f"[*] Processando {len(arquivos)} arquivos com {workers} processos...")
+    falhas = []
+    total_traducoes = 0
+    total_segmentos_modelo = 0
+    estimativa = EstimativaTempo(sum(arquivo.linhas for arquivo in arquivos))
+    with ProcessPoolExecutor(max_workers=workers, initializer=_inicializar_trabalhador,
+                             initargs=(configuracao, diretorio)) as executor:
+        futuros = [executor.submit(_processar_arquivo_trabalhador, arquivo.caminho, arquivo.slots)
+                   for arquivo in arquivos]
+        for concluidos, futuro in enumerate(as_completed(futuros), start=1):
+            try:
+                resultado = futuro.result()
+            except Exception as e:
+                print(f"❌ Erro em um processo de trabalho: {e}")
+                falhas.append(None)
+                continue
+            total_segmentos_modelo += resultado['segmentos_modelo']
+            if PERFIL is not None and resultado['perfil'] is not None:
+                PERFIL.mesclar(resultado['perfil'])
+            relativo = os.path.relpath(resultado['arquivo'], diretorio)
+            if resultado['traducoes'] is None:
+                falhas.append(resultado['arquivo'])
+                print(f"   [{concluidos}/{len(arquivos)}] {relativo}: ❌ não foi gravado")
+            else:
+                total_traducoes += resultado['traducoes']
+                estimativa.avancar(resultado['traducoes'])
+                if manifesto is not None:
+                    manifesto.concluir(resultado['arquivo'])
+                print(f"   [{concluidos}/{len(arquivos)}] {relativo}: "
+                      f"{resultado['traducoes']} linhas em {resultado['segundos']:.1f}s ({estimativa.descrever()})")
+            for linha in resultado['saida'].splitlines():
+                if linha.lstrip().startswith(('❌', '⚠️')):
+                    print(f"      {linha.strip()}")
+    print(f"[*] Segmentos enviados ao modelo pelos processos: {total_segmentos_modelo}")
+    return total_traducoes, len(falhas)
+
+def listar_arquivos_rpy(diretorio):
+    """
+    Retorna os caminhos dos arquivos .rpy do diretório e de todas as subpastas,
+    em ordem alfabética. Pastas ocultas (como '.git') são ignoradas, assim como as
+    pastas de idioma dentro de um 'tl' (game/tl/spanish, game/tl/french...): cada
+    idioma é traduzido apontando para a própria pasta (game/tl/portuguese).
+    """
+    caminhos = []
+    for raiz, pastas, nomes in os.walk(diretorio):
+        if os.path.basename(os.path.normpath(raiz)) == 'tl':
+            if pastas:
+                print(f"⚠️  Aviso: As pastas de idioma em '{raiz}' foram ignoradas ({', '.join(sorted(pastas))}). "
+                      f"Aponte para a pasta do idioma, como '{os.path.join(raiz, 'portuguese')}'.")
+            pastas[:] = []
+        else:
+            pastas[:] = sorted(pasta for pasta in pastas if not pasta.startswith('.'))
+        caminhos.extend(os.path.join(raiz, nome) for nome in sorted(nomes) if nome.endswith(".rpy"))
+    return caminhos
+
+ArquivoPendente = namedtuple('ArquivoPendente', 'caminho linhas caracteres slots')
+
+def indexar_arquivos_rpy(caminhos_arquivos, diretorio, manifesto=None):
+    """
+    Pré-análise dos .rpy: conta as linhas pendentes e os caracteres a traduzir de
+    cada arquivo, sem carregar o modelo. Retorna os ArquivoPendente com algo a
+    traduzir, do maior para o menor em caracteres; os demais ficam de fora (e são
+    registrados no manifesto como concluídos). Os slots coletados aqui seguem até
+    a escrita, então cada arquivo é lido só mais uma vez, na passada que o regrava.
+    """
+    arquivos = []
+    sem_pendencias = 0
+    for caminho_arquivo in caminhos_arquivos:
+        with medir_etapa('leitura_rpy'):
+            slots = coletar_slots_arquivo_rpy(caminho_arquivo)
+        if slots is None:
+            continue
+        if not slots:
+            # Só os arquivos sem pendências precisam do registro (e do hash) agora;
+            # os demais são registrados quando forem gravados.
+            if manifesto is not None:
+                manifesto.registrar(caminho_arquivo, 0)
+            sem_pendencias += 1
+            continue
+        arquivos.append(ArquivoPendente(caminho_arquivo, len(slots), sum(len(slot.texto) for slot in slots), slots))
+    if manifesto is not None:
+        manifesto.salvar()
+    arquivos.sort(key=lambda arquivo: arquivo.caracteres, reverse=True)
+
+    total_linhas = sum(arquivo.linhas for arquivo in arquivos)
+    total_caracteres = sum(arquivo.caracteres for arquivo in arquivos)
+    print(f"📊 Pré-análise: {len(arquivos)} arquivos com {total_linhas} linhas pendentes "
+          f"({total_caracteres} caracteres); {sem_pendencias} arquivos sem pendências ignorados.")
+    for arquivo in arquivos[:3]:
+        print(f"    -> {os.path.relpath(arquivo.caminho, diretorio)}: "
+              f"{arquivo.linhas} linhas, {arquivo.caracteres} caracteres")
+    return arquivos
+
 def modo_rpy(diretorio):
     """Função principal para o modo de tradução de arquivos Ren'Py."""
     print("\n--- MODO DE TRADUÇÃO REN'PY (.rpy) ---")
     if not os.path.isdir(diretorio):
         print(f"❌ ERRO: O diretório '{diretorio}' não existe.")
         sys.exit(1)
+    if CONFIGURACAO['destinos'] != ['pb']:
+        modo_rpy_destinos(diretorio, CONFIGURACAO['destinos'])
+        return
 
-    global TRADUTOR
-    TRADUTOR = configurar_tradutor("en", "pb", diretorio_base=diretorio) # Alterado de 'pb' para 'pt'
-
-    arquivos_rpy = sorted([f for f in os.listdir(diretorio) if f.endswith(".rpy")])
-    if not arquivos_rpy:
+    caminhos = listar_arquivos_rpy(diretorio)
+    if not caminhos:
         print("⚠️  Nenhum arquivo .rpy encontrado no diretório.")
         return
 
+    manifesto = ManifestoRpy(diretorio) if CONFIGURACAO['usar_manifesto'] else None
+    if manifesto is not None:
+        caminhos = manifesto.planejar(caminhos, retomar=CONFIGURACAO['retomar'])
+        if not caminhos:
+            manifesto.finalizar()
+            print("✅ Todos os arquivos .rpy já estão traduzidos. Nada a fazer.")
+            return
+
+    # 1ª etapa: pré-análise de todos os arquivos (linhas e caracteres pendentes).
+    print(f"[*] Analisando {len(caminhos)} arquivos .rpy...")
+    arquivos = indexar_arquivos_rpy(caminhos, diretorio, manifesto)
+    if not arquivos:
+        if manifesto is not None:
+            manifesto.finalizar()
+        print("✅ Nenhum texto pendente nos arquivos .rpy. Nada a fazer.")
+        return
+
+    # O modelo só é carregado quando há de fato algo a traduzir.
+    inicializar_traducao(diretorio, "en", "pb")
+
+    workers = min(CONFIGURACAO['workers'], len(arquivos))
+    if workers > 1:
+        MEMORIA.gravar_pendentes()
+        total_traducoes_geral, arquivos_com_erro = processar_arquivos_em_paralelo(arquivos, diretorio, workers, manifesto)
+        if manifesto is not None:
+            manifesto.finalizar()
+        finalizar_modo_rpy(len(arquivos), total_traducoes_geral, arquivos_com_erro)
+        return
+
+    # 2ª etapa: traduz em lote todos os textos pendentes, dos maiores arquivos para os menores.
+    pretraduzir([slot.texto for arquivo in arquivos for slot in arquivo.slots])
+    MEMORIA.gravar_pendentes()
+
+    # 3ª etapa: grava cada arquivo usando as traduções já em memória.
     total_traducoes_geral = 0
-    for nome_arquivo in arquivos_rpy:
-        caminho_completo = os.path.join(diretorio, nome_arquivo)
-        total_traducoes_geral += processar_arquivo_rpy(caminho_completo)
+    arquivos_com_erro = 0
+    for arquivo in arquivos:
+        traducoes = processar_arquivo_rpy(arquivo.caminho, pretraduzir_lote=False, slots=arquivo.slots)
+        if traducoes is None:
+            # Fica com as linhas pendentes no manifesto e volta na próxima execução.
+            arquivos_com_erro += 1
+            continue
+        total_traducoes_geral += traducoes
+        if manifesto is not None:
+            manifesto.concluir(arquivo.caminho)
+    if manifesto is not None:
+        manifesto.finalizar()
+
+    finalizar_modo_rpy(len(arquivos), total_traducoes_geral, arquivos_com_erro)
+
+RE_TRANSLATE_IDIOMA = re.compile(r'^(\s*translate\s+)(\w+)(?=\s)')
+
+def pasta_destino_rpy(diretorio, codigo_destino):
+    """
+    Pasta de saída de um idioma: se a pasta de entrada é uma pasta de idioma do
+    Ren'Py (game/tl/portuguese), a vizinha com o nome do destino (game/tl/spanish);
+    senão, '<pasta>_<código>'. Pode ser a própria pasta de entrada.
+    """
+    diretorio = os.path.normpath(diretorio)
+    if os.path.basename(diretorio) in NOMES_IDIOMAS_RENPY.values():
+        return os.path.join(os.path.dirname(diretorio), NOMES_IDIOMAS_RENPY.get(codigo_destino, codigo_destino))
+    return f"{diretorio}_{codigo_destino}"
+
+def modo_rpy_destinos(diretorio, destinos):
+    """
+    Modo Ren'Py com vários idiomas de destino: lê e analisa os .rpy uma única vez,
+    traduz em lote os textos únicos para cada destino (com os modelos carregados
+    juntos, ver ativar_destino()) e grava uma árvore por idioma, trocando o idioma
+    das instruções 'translate <idioma> ...'. Arquivos que já existem na pasta de
+    outro idioma são mantidos, a menos que --sobrescrever seja usado. O manifesto
+    e --workers não se aplicam aqui.
+    """
+    pastas_usadas = {}
+    for codigo_destino in destinos:
+        pasta_saida = os.path.realpath(pasta_destino_rpy(diretorio, codigo_destino))
+        if pasta_saida in pastas_usadas:
+            print(f"❌ ERRO: Os destinos '{pastas_usadas[pasta_saida]}' e '{codigo_destino}' seriam gravados "
+                  f"na mesma pasta ('{pasta_saida}'). Use só um deles em --destinos.")
+            sys.exit(1)
+        pastas_usadas[pasta_saida] = codigo_destino
+    if CONFIGURACAO['workers'] > 1:
+        print("⚠️  Aviso: --workers é ignorado com vários destinos; os textos são traduzidos em lote.")
+    caminhos = listar_arquivos_rpy(diretorio)
+    if not caminhos:
+        print("⚠️  Nenhum arquivo .rpy encontrado no diretório.")
+        return
+
+    print(f"[*] Lendo {len(caminhos)} arquivos .rpy (uma única vez para {len(destinos)} idiomas)...")
+    slots_por_arquivo = [(caminho_arquivo, coletar_slots_arquivo_rpy(caminho_arquivo) or [])
+                         for caminho_arquivo in caminhos]
+    textos_pendentes = [slot.texto for _, slots in slots_por_arquivo for slot in slots]
+    if not textos_pendentes:
+        print("✅ Nenhum texto pendente nos arquivos .rpy. Nada a fazer.")
+        return
+
+    diretorio_real = os.path.realpath(diretorio)
+    idioma_origem = os.path.basename(os.path.normpath(diretorio))
+    totais = {}
+    for codigo_destino in destinos:
+        pasta_saida = pasta_destino_rpy(diretorio, codigo_destino)
+        no_lugar = os.path.realpath(pasta_saida) == diretorio_real
+        print(f"\n🌐 Destino '{codigo_destino}' -> {pasta_saida}")
+        ativar_destino(diretorio, codigo_destino)
+        pretraduzir(textos_pendentes)
+
+        idioma_saida = os.path.basename(pasta_saida)
+        def ajustar_linha(linha):
+            m = RE_TRANSLATE_IDIOMA.match(linha)
+            if m and m.group(2) == idioma_origem:
+                return f"{m.group(1)}{idioma_saida}{linha[m.end():]}"
+            return linha
+
+        total = 0
+        mantidos = 0
+        for caminho_arquivo, slots in slots_por_arquivo:
+            if no_lugar and not slots:
+                continue
+            caminho_saida = os.path.join(pasta_saida, os.path.relpath(caminho_arquivo, diretorio))
+            if not no_lugar and not CONFIGURACAO['sobrescrever_destinos'] and os.path.exists(caminho_saida):
+                mantidos += 1
+                continue
+            try:
+                reescrever_rpy(caminho_arquivo, slots,
+                               backup=no_lugar and CONFIGURACAO['backup'],
+                               caminho_saida=caminho_saida,
+                               ajustar_linha=None if no_lugar else ajustar_linha)
+            except Exception as e:
+                print(f"❌ Erro ao gravar '{caminho_saida}': {e}")
+                continue
+            total += len(slots)
+        totais[codigo_destino] = total
+        MEMORIA.gravar_pendentes()
+        print(f"   -> {total} linhas traduzidas para '{codigo_destino}'.")
+        if mantidos:
+            print(f"⚠️  Aviso: {mantidos} arquivos que já existiam em '{pasta_saida}' foram mantidos "
+                  "(use --sobrescrever para regravá-los).")
+        MEMORIA.imprimir_resumo()
 
     print("\n" + "=" * 70)
     print("--- Processo Ren'Py Concluído ---")
-    print(f"✅ Arquivos .rpy processados: {len(arquivos_rpy)}")
+    print(f"✅ Arquivos .rpy processados: {len(caminhos)} (lidos uma vez)")
+    for codigo_destino, total in totais.items():
+        print(f"✅ {codigo_destino}: {total} linhas traduzidas em {pasta_destino_rpy(diretorio, codigo_destino)}")
+    print("🔔 Lembrete: Faça uma revisão manual dos textos traduzidos!")
+    print("=" * 70)
+
+def finalizar_modo_rpy(total_arquivos, total_traducoes_geral, arquivos_com_erro=0):
+    """Imprime o resumo final do modo Ren'Py."""
+    print("\n" + "=" * 70)
+    print("--- Processo Ren'Py Concluído ---")
+    print(f"✅ Arquivos .rpy processados: {total_arquivos - arquivos_com_erro}")
     print(f"✅ Total de linhas traduzidas: {total_traducoes_geral}")
+    if arquivos_com_erro:
+        print(f"❌ Arquivos com erro (serão tentados de novo na próxima execução): {arquivos_com_erro}")
+    MEMORIA.gravar_pendentes()
+    MEMORIA.imprimir_resumo()
+    print("🔔 Lembrete: Faça uma revisão manual dos textos traduzidos!")
+    print("=" * 70)
+
+# --- MODOS DISTRIBUÍDOS: EXTRAIR / SEGMENTOS / INJETAR ---
+#
+# Arquivo de segmentos: JSON Lines, um texto original único por linha:
+#   {"id": "<sha1 do texto>", "texto": "...",
+#    "ocorrencias": [["pasta/arquivo.rpy", linha, "dialogo", "    e ", ""], ...]}
+# Cada ocorrência é (arquivo relativo à pasta do jogo, índice da linha vazia, tipo,
+# prefixo e sufixo da linha traduzida), como em SlotRpy. O shard de um texto é
+# int(id, 16) % N, então a divisão não depende da ordem nem da máquina.
+# A tradução de um shard gera '<shard>.traduzido.jsonl' com o campo "traducao".
+
+def identificar_segmento(texto):
+    return hashlib.sha1(texto.encode('utf-8')).hexdigest()
+
+def nome_shard(caminho_base, indice, total):
+    """'segmentos.jsonl' -> 'segmentos-002-de-008.jsonl' (ou o próprio nome com um shard só)."""
+    if total <= 1:
+        return caminho_base
+    raiz, extensao = os.path.splitext(caminho_base)
+    return f"{raiz}-{indice + 1:03d}-de-{total:03d}{extensao or '.jsonl'}"
+
+def ler_segmentos(caminho):
+    """Gera os registros de um arquivo de segmentos (JSON Lines)."""
+    with open(caminho, 'r', encoding='utf-8') as f:
+        for numero, linha in enumerate(f, start=1):
+            if not linha.strip():
+                continue
+            try:
+                yield json.loads(linha)
+            except ValueError as e:
+                raise ValueError(f"{os.path.basename(caminho)}, linha {numero}: {e}") from None
+
+def gravar_segmentos(caminho, registros):
+    """Grava os registros em JSON Lines, de forma atômica."""
+    with gravacao_atomica(caminho) as f:
+        for registro in registros:
+            f.write(json.dumps(registro, ensure_ascii=False, separators=(',', ':')))
+            f.write('\n')
+
+def modo_extrair(diretorio, caminho_segmentos=None, shards=1):
+    """
+    Coleta todos os slots pendentes dos .rpy da pasta (mesma lógica de
+    processar_arquivo_rpy), agrupa as ocorrências de cada texto e grava um ou
+    mais arquivos de segmentos. Não carrega o modelo nem altera os .rpy.
+    """
+    print("\n--- MODO EXTRAIR (segmentos pendentes dos .rpy) ---")
+    if not os.path.isdir(diretorio):
+        print(f"❌ ERRO: O diretório '{diretorio}' não existe.")
+        sys.exit(1)
+    caminho_segmentos = caminho_segmentos or os.path.join(diretorio, NOME_SEGMENTOS_PADRAO)
+    shards = max(1, shards)
+
+    segmentos = {}
+    total_ocorrencias = 0
+    caminhos = listar_arquivos_rpy(diretorio)
+    for caminho_arquivo in caminhos:
+        slots = coletar_slots_arquivo_rpy(caminho_arquivo)
+        if not slots:
+            continue
+        relativo = os.path.relpath(caminho_arquivo, diretorio).replace(os.sep, '/')
+        for slot in slots:
+            registro = segmentos.get(slot.texto)
+            if registro is None:
+                registro = segmentos[slot.texto] = {
+                    'id': identificar_segmento(slot.texto), 'texto': slot.texto, 'ocorrencias': [],
+                }
+            registro['ocorrencias'].append([relativo, slot.linha, slot.tipo, slot.prefixo, slot.sufixo])
+            total_ocorrencias += 1
+
+    if not segmentos:
+        print("✅ Nenhum texto pendente nos arquivos .rpy. Nada a extrair.")
+        return
+
+    divisao = [[] for _ in range(shards)]
+    for registro in segmentos.values():
+        divisao[int(registro['id'], 16) % shards].append(registro)
+    for indice, registros in enumerate(divisao):
+        caminho_shard = nome_shard(caminho_segmentos, indice, shards)
+        gravar_segmentos(caminho_shard, registros)
+        print(f"[*] {os.path.basename(caminho_shard)}: {len(registros)} segmentos")
+
+    print("\n" + "=" * 70)
+    print(f"✅ {total_ocorrencias} linhas pendentes em {len(caminhos)} arquivos .rpy -> "
+          f"{len(segmentos)} textos únicos em {shards} arquivo(s) de segmentos.")
+    print("   Traduza cada arquivo com '--modo segmentos <arquivo>' e depois use '--modo injetar'.")
+    print("=" * 70)
+
+def modo_segmentos(caminho_segmentos):
+    """
+    Traduz um arquivo (shard) de segmentos com o pipeline completo e grava
+    '<arquivo>.traduzido.jsonl'. O modelo e a memória são procurados na pasta do arquivo.
+    """
+    print("\n--- MODO SEGMENTOS (tradução de um shard) ---")
+    if not os.path.isfile(caminho_segmentos):
+        print(f"❌ ERRO: O arquivo '{caminho_segmentos}' não foi encontrado.")
+        sys.exit(1)
+    try:
+        registros = list(ler_segmentos(caminho_segmentos))
+    except (OSError, ValueError) as e:
+        print(f"❌ Erro ao ler o arquivo de segmentos: {e}")
+        sys.exit(1)
+    if not registros:
+        print("⚠️  O arquivo de segmentos está vazio.")
+        return
+
+    inicializar_traducao(os.path.dirname(os.path.abspath(caminho_segmentos)), "en", CONFIGURACAO['destinos'][0])
+    pretraduzir([registro['texto'] for registro in registros])
+    for numero, registro in enumerate(registros, start=1):
+        registro['traducao'] = processar_paragrafo_completo(registro['texto'])
+        print(f"    -> Segmentos: {numero}/{len(registros)}", end='\r')
+    print()
+
+    raiz, _ = os.path.splitext(caminho_segmentos)
+    caminho_saida = f"{raiz}{SUFIXO_SEGMENTOS_TRADUZIDOS}"
+    gravar_segmentos(caminho_saida, registros)
+    MEMORIA.gravar_pendentes()
+    print("\n" + "=" * 70)
+    print(f"✅ {len(registros)} segmentos traduzidos: {caminho_saida}")
+    MEMORIA.imprimir_resumo()
+    print("=" * 70)
+
+def modo_injetar(diretorio, caminhos_segmentos=None):
+    """
+    Junta os arquivos '*.traduzido.jsonl' e preenche os slots dos .rpy com as
+    traduções. Os slots são procurados de novo em cada arquivo e casados pelo
+    texto original, então linhas deslocadas desde a extração não atrapalham.
+    """
+    print("\n--- MODO INJETAR (traduções de volta aos .rpy) ---")
+    if not os.path.isdir(diretorio):
+        print(f"❌ ERRO: O diretório '{diretorio}' não existe.")
+        sys.exit(1)
+    if not caminhos_segmentos:
+        caminhos_segmentos = [os.path.join(diretorio, nome) for nome in sorted(os.listdir(diretorio))
+                              if nome.endswith(SUFIXO_SEGMENTOS_TRADUZIDOS)]
+    if not caminhos_segmentos:
+        print(f"⚠️  Nenhum arquivo '*{SUFIXO_SEGMENTOS_TRADUZIDOS}' encontrado.")
+        return
+
+    traducoes = {}
+    arquivos = set()
+    for caminho in caminhos_segmentos:
+        try:
+            for registro in ler_segmentos(caminho):
+                if registro.get('traducao') is None:
+                    continue
+                traducoes[registro['texto']] = registro['traducao']
+                arquivos.update(ocorrencia[0] for ocorrencia in registro['ocorrencias'])
+        except (OSError, ValueError, KeyError) as e:
+            print(f"❌ Erro ao ler '{caminho}': {e}")
+            sys.exit(1)
+    print(f"[*] {len(traducoes)} traduções lidas de {len(caminhos_segmentos)} arquivo(s).")
+
+    manifesto = ManifestoRpy(diretorio) if CONFIGURACAO['usar_manifesto'] else None
+    total_injetadas = 0
+    total_restantes = 0
+    for relativo in sorted(arquivos):
+        caminho_arquivo = os.path.join(diretorio, *relativo.split('/'))
+        if not os.path.isfile(caminho_arquivo):
+            print(f"⚠️  Aviso: '{relativo}' não existe mais na pasta. Ignorado.")
+            continue
+        slots = coletar_slots_arquivo_rpy(caminho_arquivo)
+        if not slots:
+            continue
+        slots_traduzidos = [slot for slot in slots if slot.texto in traducoes]
+        restantes = len(slots) - len(slots_traduzidos)
+        if slots_traduzidos:
+            try:
+                reescrever_rpy(caminho_arquivo, slots_traduzidos, backup=CONFIGURACAO['backup'],
+                               traduzir=traducoes.__getitem__)
+            except Exception as e:
+                print(f"❌ Erro ao gravar '{relativo}': {e}")
+                continue
+            print(f"📄 {relativo}: {len(slots_traduzidos)} linhas preenchidas"
+                  + (f", {restantes} ainda pendentes" if restantes else ""))
+        total_injetadas += len(slots_traduzidos)
+        total_restantes += restantes
+        if manifesto is not None:
+            manifesto.registrar(caminho_arquivo, restantes)
+    if manifesto is not None:
+        manifesto.salvar()
+
+    print("\n" + "=" * 70)
+    print(f"✅ Total de linhas preenchidas: {total_injetadas}")
+    if total_restantes:
+        print(f"⚠️  {total_restantes} linhas continuam pendentes (sem tradução nos arquivos de segmentos).")
     print("🔔 Lembrete: Faça uma revisão manual dos textos traduzidos!")
     print("=" * 70)
 
 # --- MODO DE TRADUÇÃO: WORD (.docx) ---
+#
+# O documento é traduzido no próprio XML: cada parágrafo (do corpo, de tabelas
+# aninhadas, cabeçalhos, rodapés e caixas de texto) é dividido em trechos nas
+# tabulações, quebras e imagens, e cada trecho é traduzido inteiro. Quando o
+# trecho mistura formatações (negrito, link...), os grupos de runs diferentes do
+# predominante viram tags '{rN}...{/rN}', protegidas como o código Ren'Py, e a
+# tradução volta para os runs de cada grupo.
 
-def modo_docx(caminho_arquivo):
-    """Função principal para o modo de tradução de arquivos Word."""
+NS_WORD = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+TAG_PARAGRAFO = NS_WORD + 'p'
+TAG_RUN = NS_WORD + 'r'
+TAG_TEXTO = NS_WORD + 't'
+ATRIBUTO_ESPACO = '{http://www.w3.org/XML/1998/namespace}space'
+# Filhos de um run que não interrompem o texto nem mudam a sua aparência.
+FILHOS_RUN_IGNORADOS = {NS_WORD + 'rPr', NS_WORD + 'lastRenderedPageBreak', NS_WORD + 'softHyphen'}
+# Propriedades que não mudam a aparência (idioma, revisão ortográfica).
+PROPRIEDADES_RUN_IGNORADAS = {NS_WORD + 'lang', NS_WORD + 'noProof'}
+RE_TAG_GRUPO = re.compile(r'\{(/?)r(\d+)\}')
+
+TrechoDocx = namedtuple('TrechoDocx', 'grupos marcados texto prefixo sufixo')
+
+def _paragrafo_do_run(run):
+    """Parágrafo mais próximo que contém o run (um run de caixa de texto pertence ao parágrafo dela)."""
+    elemento = run.getparent()
+    while elemento is not None and elemento.tag != TAG_PARAGRAFO:
+        elemento = elemento.getparent()
+    return elemento
+
+def _chave_formatacao(run):
+    """Identifica a aparência de um run: o elemento pai (link, campo...) e as propriedades visuais."""
+    propriedades = run.find(NS_WORD + 'rPr')
+    if propriedades is None:
+        return (run.getparent(), ())
+    return (run.getparent(), tuple((filho.tag, tuple(sorted(filho.attrib.items())))
+                                   for filho in propriedades if filho.tag not in PROPRIEDADES_RUN_IGNORADAS))
+
+def _montar_trecho(elementos):
+    """Cria o TrechoDocx de uma sequência de (w:t, chave), ou None se não houver o que traduzir."""
+    grupos, chaves = [], []
+    for elemento, chave in elementos:
+        if chaves and chaves[-1] == chave:
+            grupos[-1].append(elemento)
+        else:
+            grupos.append([elemento])
+            chaves.append(chave)
+    textos = [''.join(elemento.text or '' for elemento in grupo) for grupo in grupos]
+    texto = ''.join(textos)
+    if not texto.strip() or texto.strip() == 'EMPTYSTRING':
+        return None
+
+    # A formatação com mais texto fica sem tag; os demais grupos com texto são marcados.
+    tamanhos = Counter()
+    for chave, texto_grupo in zip(chaves, textos):
+        tamanhos[chave] += len(texto_grupo)
+    predominante = tamanhos.most_common(1)[0][0]
+    marcados = [chave != predominante and bool(texto_grupo.strip())
+                for chave, texto_grupo in zip(chaves, textos)]
+    if any(marcados):
+        texto = ''.join(f"{{r{i}}}{texto_grupo}{{/r{i}}}" if marcado else texto_grupo
+                        for i, (texto_grupo, marcado) in enumerate(zip(textos, marcados)))
+    nucleo = texto.strip()
+    prefixo = texto[:len(texto) - len(texto.lstrip())]
+    return TrechoDocx(grupos, marcados, nucleo, prefixo, texto[len(prefixo) + len(nucleo):])
+
+def coletar_trechos_paragrafo(paragrafo):
+    """Divide um w:p em trechos traduzíveis (ver o comentário da seção)."""
+    trechos, atual = [], []
+    def fechar():
+        if atual:
+            trecho = _montar_trecho(atual)
+            if trecho is not None:
+                trechos.append(trecho)
+            atual.clear()
+    for run in paragrafo.iter(TAG_RUN):
+        if _paragrafo_do_run(run) is not paragrafo:
+            continue
+        chave = None
+        for filho in run:
+            if filho.tag == TAG_TEXTO:
+                if chave is None:
+                    chave = _chave_formatacao(run)
+                atual.append((filho, chave))
+            elif filho.tag not in FILHOS_RUN_IGNORADOS:
+                # Tabulação, quebra, imagem, caixa de texto, campo...: o trecho termina aqui.
+                fechar()
+    fechar()
+    return trechos
+
+def partes_docx(documento):
+    """Elementos-raiz com texto: o corpo e cada cabeçalho/rodapé (uma vez por parte)."""
+    partes = [documento.element.body]
+    for relacao in documento.part.rels.values():
+        if relacao.is_external or not relacao.reltype.endswith(('/header', '/footer')):
+            continue
+        elemento = getattr(relacao.target_part, 'element', None)
+        if elemento is not None:
+            partes.append(elemento)
+    return partes
+
+def coletar_trechos_docx(documento):
+    """Todos os trechos traduzíveis do documento, na ordem em que aparecem."""
+    trechos = []
+    for parte in partes_docx(documento):
+        for paragrafo in parte.iter(TAG_PARAGRAFO):
+            trechos.extend(coletar_trechos_paragrafo(paragrafo))
+    return trechos
+
+def distribuir_traducao(trecho, traducao):
+    """
+    Reparte a tradução (com as tags '{rN}' do trecho) entre os grupos de runs.
+    O texto dentro de uma tag vai para o seu grupo; o texto fora das tags vai
+    para o próximo grupo sem tag depois da última tag fechada (ou, se não houver,
+    para o anterior), o que acompanha a reordenação das palavras pelo modelo.
+    """
+    textos = [''] * len(trecho.grupos)
+    livres = [i for i, marcado in enumerate(trecho.marcados) if not marcado]
+    atual, ultimo = None, -1
+    def destino_livre():
+        for i in livres:
+            if i > ultimo:
+                return i
+        return livres[-1] if livres else 0
+    posicao = 0
+    for m in RE_TAG_GRUPO.finditer(traducao):
+        indice = int(m.group(2))
+        if indice >= len(trecho.grupos) or not trecho.marcados[indice]:
+            continue
+        texto = traducao[posicao:m.start()]
+        textos[atual if atual is not None else destino_livre()] += texto
+        posicao = m.end()
+        if m.group(1):
+            atual, ultimo = None, indice
+        else:
+            atual = indice
+    textos[atual if atual is not None else destino_livre()] += traducao[posicao:]
+    return textos
+
+def aplicar_traducao_trecho(trecho, traducao):
+    """Grava a tradução nos w:t do trecho: o texto de cada grupo no seu primeiro w:t."""
+    textos = distribuir_traducao(trecho, f"{trecho.prefixo}{traducao}{trecho.sufixo}")
+    for grupo, texto in zip(trecho.grupos, textos):
+        grupo[0].text = texto
+        grupo[0].set(ATRIBUTO_ESPACO, 'preserve')
+        for elemento in grupo[1:]:
+            elemento.text = ''
+
+def ler_docx(docx, caminho_arquivo):
+    """Abre o .docx e coleta os seus trechos traduzíveis."""
+    with medir_etapa('leitura_docx'):
+        documento = docx.Document(caminho_arquivo)
+        trechos = coletar_trechos_docx(documento)
+    return documento, trechos
+
+def caminho_saida_docx(caminho_arquivo, codigo_destino):
+    """'manual.docx' -> 'manual pt-BR.docx', ao lado do original."""
+    return f"{os.path.splitext(caminho_arquivo)[0]} {rotulo_idioma(codigo_destino)}.docx"
+
+def traduzir_docx(documento, trechos, caminho_saida):
+    """
+    Traduz os trechos em lote (uma passada, sem repetições), devolve as traduções
+    aos runs e grava o documento em caminho_saida. Como cada trecho guarda o
+    texto original, o mesmo documento pode ser traduzido para outro idioma depois.
+    """
+    print(f"[*] Traduzindo {len(trechos)} trechos de texto...")
+    pretraduzir([trecho.texto for trecho in trechos])
+    for i, trecho in enumerate(trechos, start=1):
+        aplicar_traducao_trecho(trecho, processar_paragrafo_completo(trecho.texto))
+        if i % 200 == 0 or i == len(trechos):
+            print(f"    -> Progresso: {i}/{len(trechos)}", end='\r')
+    print()
+    with medir_etapa('escrita_docx'):
+        documento.save(caminho_saida)
+
+def listar_arquivos_docx(diretorio):
+    """Os .docx da pasta e subpastas, sem as traduções já geradas e os arquivos de bloqueio do Word."""
+    codigos = set(NOMES_IDIOMAS_RENPY) | set(CONFIGURACAO['destinos'])
+    sufixos_saida = tuple(f" {rotulo_idioma(codigo)}.docx" for codigo in codigos)
+    caminhos = []
+    for raiz, pastas, nomes in os.walk(diretorio):
+        pastas[:] = sorted(pasta for pasta in pastas if not pasta.startswith('.'))
+        caminhos.extend(os.path.join(raiz, nome) for nome in sorted(nomes)
+                        if nome.lower().endswith('.docx') and not nome.startswith('~$')
+                        and not nome.endswith(sufixos_saida))
+    return caminhos
+
+def _traduzir_docx_trabalhador(caminho_arquivo, codigo_destino):
+    """Traduz um .docx em um processo de trabalho (ver _processar_arquivo_trabalhador())."""
+    saida = io.StringIO()
+    memoria_antes = MEMORIA.estatisticas()
+    inicio = time.perf_counter()
+    caminho_saida = caminho_saida_docx(caminho_arquivo, codigo_destino)
+    with contextlib.redirect_stdout(saida):
+        documento, trechos = ler_docx(importar_docx(), caminho_arquivo)
+        traduzir_docx(documento, trechos, caminho_saida)
+    MEMORIA.gravar_pendentes()
+    return {
+        'arquivo': caminho_arquivo,
+        'caminho_saida': caminho_saida,
+        'trechos': len(trechos),
+        'segundos': time.perf_counter() - inicio,
+        'saida': saida.getvalue(),
+        'perfil': _perfil_trabalhador(memoria_antes, MEMORIA.estatisticas()),
+    }
+
+def traduzir_docx_em_paralelo(caminhos_arquivos, diretorio, workers, codigo_destino):
+    """Traduz os .docx em um conjunto de processos, dos maiores para os menores. Retorna os arquivos gravados."""
+    caminhos_arquivos = sorted(caminhos_arquivos, key=os.path.getsize, reverse=True)
+    print(f"[*] Processando {len(caminhos_arquivos)} documentos com {workers} processos...")
+    caminhos_saida = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_inicializar_trabalhador,
+                             initargs=(_configuracao_trabalhadores(workers), diretorio, codigo_destino)) as executor:
+        futuros = [executor.submit(_traduzir_docx_trabalhador, caminho, codigo_destino)
+                   for caminho in caminhos_arquivos]
+        for concluidos, futuro in enumerate(as_completed(futuros), start=1):
+            try:
+                resultado = futuro.result()
+            except Exception as e:
+                print(f"❌ Erro em um processo de trabalho: {e}")
+                continue
+            caminhos_saida.append(resultado['caminho_saida'])
+            if PERFIL is not None and resultado['perfil'] is not None:
+                PERFIL.mesclar(resultado['perfil'])
+            print(f"   [{concluidos}/{len(caminhos_arquivos)}] {os.path.relpath(resultado['arquivo'], diretorio)}: "
+                  f"{resultado['trechos']} trechos em {resultado['segundos']:.1f}s")
+            for linha in resultado['saida'].splitlines():
+                if linha.lstrip().startswith(('❌', '⚠️')):
+                    print(f"      {linha.strip()}")
+    return caminhos_saida
+
+def modo_docx(caminho):
+    """Função principal para o modo de tradução de arquivos Word (um .docx ou uma pasta deles)."""
     print("\n--- MODO DE TRADUÇÃO WORD (.docx) ---")
-    if not os.path.isfile(caminho_arquivo):
-        print(f"❌ ERRO: O arquivo '{caminho_arquivo}' não foi encontrado.")
+    if os.path.isdir(caminho):
+        diretorio = caminho
+        caminhos_arquivos = listar_arquivos_docx(caminho)
+        if not caminhos_arquivos:
+            print("⚠️  Nenhum arquivo .docx encontrado no diretório.")
+            return
+    elif not os.path.isfile(caminho):
+        print(f"❌ ERRO: O arquivo '{caminho}' não foi encontrado.")
         sys.exit(1)
-    if not caminho_arquivo.lower().endswith('.docx'):
+    elif not caminho.lower().endswith('.docx'):
         print(f"❌ ERRO: O arquivo fornecido não é um .docx.")
         sys.exit(1)
+    else:
+        diretorio = os.path.dirname(caminho) or "."
+        caminhos_arquivos = [caminho]
 
-    global TRADUTOR
-    TRADUTOR = configurar_tradutor("en", "pb", diretorio_base=os.path.dirname(caminho_arquivo)) # Alterado de 'pb' para 'pt'
-
+    docx = importar_docx()
+    destinos = CONFIGURACAO['destinos']
+    workers = min(CONFIGURACAO['workers'], len(caminhos_arquivos))
     try:
-        print(f"📄 Lendo o arquivo: {os.path.basename(caminho_arquivo)}")
-        documento_original = docx.Document(caminho_arquivo)
-        documento_traduzido = docx.Document()
-        total_paragrafos = len(documento_original.paragraphs)
-        print(f"[*] Traduzindo {total_paragrafos} parágrafos...")
-
-        for i, para in enumerate(documento_original.paragraphs):
-            texto_para_traduzir = para.text
-            if texto_para_traduzir.strip() == 'EMPTYSTRING':
-                documento_traduzido.add_paragraph('EMPTYSTRING')
-                continue
+        # Um único documento é lido uma vez só, mesmo com vários destinos.
+        lido = None
+        if len(caminhos_arquivos) == 1:
+            print(f"📄 Lendo o arquivo: {os.path.basename(caminhos_arquivos[0])}")
+            lido = ler_docx(docx, caminhos_arquivos[0])
 
-            if texto_para_traduzir.strip():
-                traducao_final = processar_paragrafo_completo(texto_para_traduzir)
-                documento_traduzido.add_paragraph(traducao_final)
+        caminhos_saida = []
+        for codigo_destino in destinos:
+            if len(destinos) > 1:
+                print(f"\n🌐 Destino '{codigo_destino}'")
+                ativar_destino(diretorio, codigo_destino)
             else:
-                documento_traduzido.add_paragraph('')
-            
-            print(f"    -> Progresso: {i + 1}/{total_paragrafos}", end='\r')
-        
-        print("\n[*] Tradução concluída.")
-        caminho_saida = os.path.join(os.path.dirname(caminho_arquivo), "untranslated pt-BR.docx")
-        documento_traduzido.save(caminho_saida)
+                inicializar_traducao(diretorio, "en", codigo_destino)
+            if workers > 1:
+                MEMORIA.gravar_pendentes()
+                caminhos_saida.extend(traduzir_docx_em_paralelo(caminhos_arquivos, diretorio, workers, codigo_destino))
+                continue
+            for caminho_arquivo in caminhos_arquivos:
+                try:
+                    if lido is None:
+                        print(f"\n📄 Processando: {os.path.relpath(caminho_arquivo, diretorio)}")
+                    documento, trechos = lido or ler_docx(docx, caminho_arquivo)
+                    caminho_saida = caminho_saida_docx(caminho_arquivo, codigo_destino)
+                    traduzir_docx(documento, trechos, caminho_saida)
+                    caminhos_saida.append(caminho_saida)
+                except Exception as e:
+                    if lido is not None:
+                        raise
+                    print(f"❌ Erro ao traduzir '{caminho_arquivo}': {e}")
+            MEMORIA.gravar_pendentes()
+            MEMORIA.imprimir_resumo()
 
         print("\n" + "=" * 70)
         print("--- Processo DOCX Concluído ---")
-        print(f"✅ Tradução salva em: {caminho_saida}")
+        for caminho_saida in caminhos_saida:
+            print(f"✅ Tradução salva em: {caminho_saida}")
         print("=" * 70)
 
     except Exception as e:
         print(f"\n❌ OCORREU UM ERRO INESPERADO DURANTE O PROCESSAMENTO DOCX: {e}")
         sys.exit(1)
 
+# --- MODO SERVIDOR (tradutor residente) ---
+# Protocolo: uma conexão TCP local, com um objeto JSON por linha em cada sentido.
+#   {"acao": "traduzir", "textos": [...]}  ->  {"traducoes": [...]}  (null = falhou)
+#   {"acao": "estatisticas"}               ->  {"memoria": {...}, "lotes": N}
+
+def interpretar_endereco(endereco):
+    """Converte 'host:porta' (ou só 'porta') em (host, porta)."""
+    host, _, porta = endereco.rpartition(':')
+    return (host or '127.0.0.1'), int(porta)
+
+class AgrupadorLotes:
+    """
+    Junta os pedidos de vários clientes em lotes compartilhados. Uma única thread
+    conversa com o modelo e com a memória de tradução: ela espera o primeiro
+    pedido, recolhe os que chegarem dentro de uma pequena janela e traduz tudo de
+    uma vez com traduzir_lote(), que já deduplica e consulta a memória.
+    """
+
+    def __init__(self, janela_segundos=0.01, maximo_textos=1024):
+        self.janela_segundos = janela_segundos
+        self.maximo_textos = maximo_textos
+        self.lotes_executados = 0
+        self._fila = queue.Queue()
+        threading.Thread(target=self._executar, name="agrupador-lotes", daemon=True).start()
+
+    def traduzir(self, textos):
+        """Enfileira os textos e bloqueia até que o lote que os contém termine."""
+        pedido = {'textos': textos, 'evento': threading.Event(), 'resultado': None, 'erro': None}
+        self._fila.put(pedido)
+        pedido['evento'].wait()
+        if pedido['erro'] is not None:
+            raise pedido['erro']
+        return pedido['resultado']
+
+    def _executar(self):
+        while True:
+            pedidos = [self._fila.get()]
+            total_textos = len(pedidos[0]['textos'])
+            limite = time.monotonic() + self.janela_segundos
+            while total_textos < self.maximo_textos:
+                restante = limite - time.monotonic()
+                if restante <= 0:
+                    break
+                try:
+                    pedido = self._fila.get(timeout=restante)
+                except queue.Empty:
+                    break
+                pedidos.append(pedido)
+                total_textos += len(pedido['textos'])
+
+            try:
+                traducoes = traduzir_lote([texto for pedido in pedidos for texto in pedido['textos']],
+                                          exibir_progresso=False)
+                MEMORIA.gravar_pendentes()
+                for pedido in pedidos:
+                    pedido['resultado'] = [traducoes.get(texto) for texto in pedido['textos']]
+            except Exception as e:
+                for pedido in pedidos:
+                    pedido['erro'] = e
+            finally:
+                self.lotes_executados += 1
+                for pedido in pedidos:
+                    pedido['evento'].set()
+            print(f"    -> Lote {self.lotes_executados}: {len(pedidos)} pedidos, {total_textos} segmentos")
+
+class _ManipuladorCliente(socketserver.StreamRequestHandler):
+    def handle(self):
+        for linha in self.rfile:
+            try:
+                pedido = json.loads(linha)
+                acao = pedido.get('acao')
+                if acao == 'traduzir':
+                    textos = [normalizar_texto(texto) for texto in pedido['textos']]
+                    resposta = {'traducoes': self.server.agrupador.traduzir(textos)}
+                elif acao == 'estatisticas':
+                    resposta = {'memoria': MEMORIA.estatisticas(), 'lotes': self.server.agrupador.lotes_executados}
+                else:
+                    resposta = {'erro': f"ação desconhecida: {acao!r}"}
+            except Exception as e:
+                resposta = {'erro': str(e)}
+            self.wfile.write((json.dumps(resposta, ensure_ascii=False) + '\n').encode('utf-8'))
+            self.wfile.flush()
+
+class _ServidorTraducao(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+class TradutorRemoto:
+    """
+    Backend 'remoto': cliente do tradutor residente. Tem a mesma interface do
+    TradutorEmLote (translate / traduzir_lote), então o resto do pipeline não muda.
+    """
+
+    memoria_persistente = False
+
+    def __init__(self, endereco, tempo_limite=600):
+        self.endereco = interpretar_endereco(endereco)
+        self.tempo_limite = tempo_limite
+        self._socket = None
+        self._arquivo = None
+
+    def _conectar(self):
+        self._socket = socket.create_connection(self.endereco, timeout=self.tempo_limite)
+        self._arquivo = self._socket.makefile('rwb')
+
+    def _fechar(self):
+        for objeto in (self._arquivo, self._socket):
+            if objeto is not None:
+                with contextlib.suppress(OSError):
+                    objeto.close()
+        self._socket = self._arquivo = None
+
+    def _enviar(self, pedido):
+        dados = (json.dumps(pedido, ensure_ascii=False) + '\n').encode('utf-8')
+        for tentativa in range(2):
+            try:
+                if self._socket is None:
+                    self._conectar()
+                self._arquivo.write(dados)
+                self._arquivo.flush()
+                linha = self._arquivo.readline()
+                if not linha:
+                    raise ConnectionError("o servidor fechou a conexão")
+                break
+            except socket.timeout as e:
+                # O servidor pode ainda estar traduzindo este pedido: reenviá-lo só
+                # dobraria a carga. A conexão é descartada com a resposta atrasada.
+                self._fechar()
+                raise TimeoutError(f"o servidor não respondeu em {self.tempo_limite}s") from e
+            except ConnectionError:
+                self._fechar()
+                if tentativa:
+                    raise
+            except OSError:
+                self._fechar()
+                raise
+        resposta = json.loads(linha)
+        if 'erro' in resposta:
+            raise RuntimeError(f"servidor: {resposta['erro']}")
+        return resposta
+
+    def traduzir_lote(self, textos):
+        return self._enviar({'acao': 'traduzir', 'textos': list(textos)})['traducoes']
+
+    def translate(self, texto):
+        traducao = self.traduzir_lote([texto])[0]
+        if traducao is None:
+            raise RuntimeError("o servidor não conseguiu traduzir o texto")
+        return traducao
+
+def modo_servidor(diretorio, endereco):
+    """
+    Mantém o modelo e a memória de tradução carregados e atende clientes
+    (--modo rpy/docx com --servidor) até ser interrompido com Ctrl+C.
+    """
+    print("\n--- MODO SERVIDOR (tradutor residente) ---")
+    if not os.path.isdir(diretorio):
+        print(f"❌ ERRO: O diretório '{diretorio}' não existe.")
+        sys.exit(1)
+
+    inicializar_traducao(diretorio, "en", CONFIGURACAO['destinos'][0])
+    host, porta = interpretar_endereco(endereco)
+    servidor = _ServidorTraducao((host, porta), _ManipuladorCliente)
+    servidor.agrupador = AgrupadorLotes()
+    print(f"✅ Servidor pronto em {host}:{porta}. Use --servidor {host}:{porta} nos outros modos.")
+    print("   Pressione Ctrl+C para encerrar.")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        print("\n[*] Encerrando o servidor...")
+    finally:
+        servidor.server_close()
+        MEMORIA.gravar_pendentes()
+        MEMORIA.imprimir_resumo()
+
 # --- INICIALIZAÇÃO DO SCRIPT ---
 
+def carregar_configuracao(parser, caminho):
+    """
+    Lê um arquivo JSON de opções ({"beam": 1, "tipo-calculo": "int8", ...}) e
+    retorna os valores padrão a aplicar no parser. Sai com erro se o arquivo
+    for inválido ou tiver opções desconhecidas.
+    """
+    try:
+        with open(caminho, 'r', encoding='utf-8') as f:
+            dados = json.load(f)
+    except (OSError, ValueError) as e:
+        parser.error(f"não foi possível ler o arquivo de configuração '{caminho}': {e}")
+    if not isinstance(dados, dict):
+        parser.error(f"o arquivo de configuração '{caminho}' deve conter um objeto JSON")
+    acoes = {acao.dest: acao for acao in parser._actions if acao.dest not in ('help', 'config', 'caminho')}
+    valores = {}
+    for chave, valor in dados.items():
+        destino = chave.lstrip('-').replace('-', '_')
+        if destino not in acoes:
+            parser.error(f"opção desconhecida no arquivo de configuração: '{chave}'")
+        acao = acoes[destino]
+        if acao.choices is not None and valor not in acao.choices:
+            parser.error(f"valor inválido para '{chave}' no arquivo de configuração: {valor!r}")
+        valores[destino] = valor
+    return valores
+
 def main():
     parser = argparse.ArgumentParser(
         description="Super Tradutor Automático (v7.3) para arquivos .rpy e .docx.",
@@ -470,22 +3251,305 @@ Exemplos de uso:
     parser.add_argument(
         'caminho',
         type=str,
-        help="O caminho para o diretório (modo rpy) ou arquivo (modo docx)."
+        help="O caminho para o diretório (modo rpy) ou arquivo/pasta (modo docx)."
     )
     parser.add_argument(
         '--modo',
         type=str,
-        choices=['rpy', 'docx'],
+        choices=['rpy', 'docx', 'servidor', 'extrair', 'segmentos', 'injetar'],
         required=True,
-        help="Define o modo de operação: 'rpy' para diretório Ren'Py ou 'docx' para um único arquivo Word."
+        help="Define o modo de operação: 'rpy' para diretório Ren'Py ou 'docx' para um arquivo Word (ou uma pasta deles).\n"
+             "'servidor' mantém o modelo carregado para atender outras execuções (caminho = pasta do modelo).\n"
+             "'extrair' grava os textos pendentes da pasta Ren'Py em arquivos de segmentos;\n"
+             "'segmentos' traduz um desses arquivos (caminho = arquivo .jsonl);\n"
+             "'injetar' devolve as traduções ('*.traduzido.jsonl') aos .rpy da pasta."
+    )
+
+    parser.add_argument(
+        '--memoria',
+        type=str,
+        default=None,
+        help="Arquivo SQLite da memória de tradução persistente.\n"
+             f"Padrão: '{NOME_MEMORIA_PADRAO}' na pasta do jogo/documento."
+    )
+    parser.add_argument(
+        '--sem-memoria',
+        action='store_true',
+        help="Não usa a memória de tradução em disco (apenas o cache em memória)."
+    )
+    parser.add_argument(
+        '--limpar-memoria',
+        action='store_true',
+        help="Apaga as traduções já guardadas na memória para o par de idiomas antes de começar\n"
+             "(por exemplo, depois de mudar as regras ou trocar o modelo por outro com o mesmo nome)."
+    )
+    parser.add_argument(
+        '--limite-cache-mb',
+        type=float,
+        default=64,
+        help="Limite, em MB, do cache de traduções mantido em memória (padrão: 64)."
+    )
+
+    parser.add_argument(
+        '--lote',
+        type=int,
+        default=32,
+        help="Quantidade de segmentos enviados ao modelo por chamada em lote (padrão: 32)."
+    )
+
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=1,
+        help="Modos rpy e docx (pasta): quantidade de processos paralelos (padrão: 1).\n"
+             "Cada processo carrega o modelo uma vez e recebe os arquivos maiores primeiro."
+    )
+
+    parser.add_argument(
+        '--protecao',
+        type=str,
+        choices=['mascara', 'divisao'],
+        default='mascara',
+        help="Como proteger tags {...} e variáveis [...] (padrão: mascara).\n"
+             "  mascara: troca o código por marcadores e traduz a linha inteira de uma vez.\n"
+             "  divisao: traduz cada trecho de texto entre os códigos separadamente."
+    )
+
+    parser.add_argument(
+        '--regras',
+        type=str,
+        default=None,
+        help="Pasta com regras extras de pós-processamento em JSON, no formato\n"
+             "{\"texto ou padrão\": \"substituição\"}. Arquivos reconhecidos:\n"
+             "  correcoes_contextuais.json (expressões regulares),\n"
+             "  regras_formais.json e regras_informais.json (palavras/expressões)."
+    )
+
+    parser.add_argument(
+        '--retomar',
+        action='store_true',
+        help="Modo rpy: continua a execução interrompida registrada no manifesto\n"
+             f"('{NOME_MANIFESTO}'), processando só os arquivos que faltavam."
+    )
+    parser.add_argument(
+        '--sem-manifesto',
+        action='store_true',
+        help="Modo rpy: ignora o manifesto e verifica todos os arquivos novamente."
+    )
+    parser.add_argument(
+        '--checkpoint',
+        type=int,
+        default=256,
+        help="Grava a memória de tradução em disco a cada N segmentos traduzidos (padrão: 256)."
+    )
+
+    parser.add_argument(
+        '--sem-backup',
+        action='store_true',
+        help="Modo rpy: não cria o arquivo '.bak' antes de regravar cada .rpy."
+    )
+
+    parser.add_argument(
+        '--offline',
+        action='store_true',
+        help="Nunca acessa a rede: não atualiza o índice de pacotes, não baixa modelos\n"
+             "e não instala dependências com pip. Use em máquinas sem internet."
+    )
+
+    parser.add_argument(
+        '--servidor',
+        type=str,
+        default=None,
+        metavar='HOST:PORTA',
+        help="Modos rpy/docx: envia os segmentos a um tradutor residente (--modo servidor)\n"
+             "em vez de carregar o modelo. No modo servidor: endereço de escuta\n"
+             f"(padrão: 127.0.0.1:{PORTA_SERVIDOR_PADRAO})."
+    )
+
+    parser.add_argument(
+        '--perfil',
+        type=str,
+        nargs='?',
+        const=NOME_PERFIL_PADRAO,
+        default=None,
+        metavar='ARQUIVO',
+        help="Mede o tempo de cada etapa (modelo, proteção de código, correções,\n"
+             "formalidade, adaptação, leitura/escrita), a latência das chamadas ao modelo,\n"
+             "a taxa de acerto do cache e o tamanho dos segmentos, e salva tudo em JSON\n"
+             f"(padrão: '{NOME_PERFIL_PADRAO}')."
+    )
+
+    parser.add_argument(
+        '--backend',
+        choices=sorted(nome for nome in BACKENDS if nome != 'remoto'),
+        default='argos',
+        help="Backend de tradução (padrão: 'argos'). 'simulado' não carrega modelo algum:\n"
+             "marca as palavras com '~' e serve para testes e medições."
+    )
+    parser.add_argument(
+        '--threads-intra',
+        type=int,
+        default=0,
+        metavar='N',
+        help="Threads usadas pelo CTranslate2 em cada operação (padrão: 0 = automático;\n"
+             "com --workers, os núcleos são divididos entre os processos)."
+    )
+    parser.add_argument(
+        '--threads-inter',
+        type=int,
+        default=1,
+        metavar='N',
+        help="Lotes traduzidos em paralelo pelo CTranslate2 (padrão: 1). Útil com --max-tokens-lote."
+    )
+    parser.add_argument(
+        '--beam',
+        type=int,
+        default=DECODIFICACAO_PADRAO['beam_size'],
+        metavar='N',
+        help=f"Tamanho do beam (padrão: {DECODIFICACAO_PADRAO['beam_size']}). 1 = decodificação gulosa,\n"
+             "bem mais rápida, com qualidade um pouco menor (bom para rascunhos)."
+    )
+    parser.add_argument(
+        '--tipo-calculo',
+        choices=TIPOS_CALCULO,
+        default=DECODIFICACAO_PADRAO['tipo_calculo'],
+        help="Quantização do modelo no CTranslate2 (padrão: 'default', o tipo salvo no modelo).\n"
+             "'int8' acelera bastante em CPU com pouca perda de qualidade."
+    )
+    parser.add_argument(
+        '--max-tokens-lote',
+        type=int,
+        default=0,
+        metavar='N',
+        help="Divide cada lote enviado ao modelo em sublotes de até N tokens (padrão: 0 = sem limite)."
+    )
+    parser.add_argument(
+        '--sem-segmentacao',
+        action='store_true',
+        help="Traduz cada linha/parágrafo inteiro em uma só chamada, em vez de frase a frase."
+    )
+    parser.add_argument(
+        '--aproximada',
+        type=float,
+        nargs='?',
+        const=LIMIAR_APROXIMADO_PADRAO,
+        default=0.0,
+        metavar='LIMIAR',
+        help="Reaproveita a tradução de frases quase iguais já traduzidas (que diferem só em\n"
+             "nomes, números ou pontuação final) em vez de chamar o modelo. LIMIAR é a\n"
+             f"semelhança mínima entre 0 e 1 (padrão: {LIMIAR_APROXIMADO_PADRAO})."
+    )
+    parser.add_argument(
+        '--aproximada-rpy',
+        action='append',
+        default=[],
+        metavar='PASTA',
+        help="Pasta com arquivos .rpy já traduzidos (revisados ou não) para alimentar a memória\n"
+             "aproximada. Pode ser repetida. Ativa --aproximada com o limiar padrão."
+    )
+    parser.add_argument(
+        '--segmentos',
+        action='append',
+        default=[],
+        metavar='ARQUIVO',
+        help=f"Modo extrair: arquivo de segmentos a gravar (padrão: '{NOME_SEGMENTOS_PADRAO}' na pasta).\n"
+             f"Modo injetar: arquivo(s) traduzido(s) a ler (padrão: '*{SUFIXO_SEGMENTOS_TRADUZIDOS}' na pasta)."
+    )
+    parser.add_argument(
+        '--shards',
+        type=int,
+        default=1,
+        metavar='N',
+        help="Modo extrair: divide os segmentos em N arquivos pelo hash do texto (padrão: 1)."
+    )
+    parser.add_argument(
+        '--destinos',
+        type=str,
+        default='pb',
+        metavar='CÓDIGOS',
+        help="Idiomas de destino separados por vírgula (padrão: 'pb'). Ex.: --destinos pb,es,fr\n"
+             "Os arquivos são lidos uma vez e cada idioma vai para a sua própria pasta/arquivo;\n"
+             "as regras de pós-processamento pt-BR só se aplicam a 'pb'/'pt'.\n"
+             "Nos modos servidor e segmentos, vale só o primeiro idioma."
+    )
+    parser.add_argument(
+        '--limite-modelos-mb',
+        type=int,
+        default=4096,
+        metavar='N',
+        help="Memória máxima, em MB, dos modelos carregados ao mesmo tempo com --destinos (padrão: 4096).\n"
+             "Acima disso, o modelo usado há mais tempo é descarregado."
+    )
+    parser.add_argument(
+        '--sobrescrever',
+        action='store_true',
+        help="Modo rpy com --destinos: regrava os .rpy que já existem nas pastas dos outros idiomas\n"
+             "(por padrão eles são mantidos, com as traduções que já tinham)."
+    )
+    parser.add_argument(
+        '--config',
+        type=str,
+        default=None,
+        metavar='ARQUIVO',
+        help="Arquivo JSON com valores para as opções acima, pelo nome longo sem '--'\n"
+             "(ex.: {\"beam\": 1, \"tipo_calculo\": \"int8\"}). A linha de comando tem prioridade."
     )
 
+    argumentos_config, _ = parser.parse_known_args()
+    if argumentos_config.config:
+        parser.set_defaults(**carregar_configuracao(parser, argumentos_config.config))
     args = parser.parse_args()
+    CONFIGURACAO['caminho_memoria'] = args.memoria
+    CONFIGURACAO['usar_memoria_disco'] = not args.sem_memoria
+    CONFIGURACAO['limpar_memoria'] = args.limpar_memoria
+    CONFIGURACAO['limite_cache_mb'] = args.limite_cache_mb
+    CONFIGURACAO['tamanho_lote'] = args.lote
+    CONFIGURACAO['workers'] = max(1, args.workers)
+    CONFIGURACAO['protecao'] = args.protecao
+    CONFIGURACAO['pasta_regras'] = args.regras
+    CONFIGURACAO['usar_manifesto'] = not args.sem_manifesto
+    CONFIGURACAO['retomar'] = args.retomar
+    CONFIGURACAO['intervalo_checkpoint'] = args.checkpoint
+    CONFIGURACAO['backup'] = not args.sem_backup
+    CONFIGURACAO['offline'] = args.offline
+    if args.modo != 'servidor':
+        CONFIGURACAO['servidor'] = args.servidor
+    CONFIGURACAO['perfil'] = args.perfil
+    CONFIGURACAO['backend'] = args.backend
+    CONFIGURACAO['threads_modelo'] = max(0, args.threads_intra)
+    CONFIGURACAO['threads_inter'] = max(1, args.threads_inter)
+    CONFIGURACAO['beam_size'] = max(1, args.beam)
+    CONFIGURACAO['tipo_calculo'] = args.tipo_calculo
+    CONFIGURACAO['max_tokens_lote'] = max(0, args.max_tokens_lote)
+    CONFIGURACAO['segmentar_frases'] = not args.sem_segmentacao
+    CONFIGURACAO['pastas_aproximadas'] = args.aproximada_rpy
+    CONFIGURACAO['destinos'] = list(dict.fromkeys(codigo.strip().lower() for codigo in args.destinos.split(',')
+                                                  if codigo.strip())) or ['pb']
+    CONFIGURACAO['limite_modelos_mb'] = max(0, args.limite_modelos_mb)
+    CONFIGURACAO['sobrescrever_destinos'] = args.sobrescrever
+    if CONFIGURACAO['servidor'] and len(CONFIGURACAO['destinos']) > 1:
+        parser.error("--servidor atende um único idioma de destino; use um --destinos só.")
+    CONFIGURACAO['limiar_aproximado'] = args.aproximada or (LIMIAR_APROXIMADO_PADRAO if args.aproximada_rpy else 0.0)
 
-    if args.modo == 'rpy':
-        modo_rpy(args.caminho)
-    elif args.modo == 'docx':
-        modo_docx(args.caminho)
+    global PERFIL
+    if args.perfil:
+        PERFIL = PerfilExecucao()
+    try:
+        if args.modo == 'rpy':
+            modo_rpy(args.caminho)
+        elif args.modo == 'docx':
+            modo_docx(args.caminho)
+        elif args.modo == 'servidor':
+            modo_servidor(args.caminho, args.servidor or f"127.0.0.1:{PORTA_SERVIDOR_PADRAO}")
+        elif args.modo == 'extrair':
+            modo_extrair(args.caminho, args.segmentos[0] if args.segmentos else None, args.shards)
+        elif args.modo == 'segmentos':
+            modo_segmentos(args.caminho)
+        elif args.modo == 'injetar':
+            modo_injetar(args.caminho, args.segmentos)
+    finally:
+        if PERFIL is not None:
+            PERFIL.salvar(args.perfil, MEMORIA)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
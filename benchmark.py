@@ -0,0 +1,318 @@
+# -*- coding: utf-8 -*-
+
+"""
+BENCHMARK DO SUPER TRADUTOR AUTOMÁTICO
+
+Mede a vazão do script principal ("Pack 4.5.py") sobre corpora sintéticos:
+- Gera árvores .rpy com blocos old/new, diálogos e narrações comentados,
+  tags {...} e variáveis [...], além de arquivos .docx grandes.
+- Cronometra processar_arquivo_rpy, processar_paragrafo_completo e modo_docx
+  de ponta a ponta, com o modelo real do Argos ou com um tradutor simulado
+  determinístico (que isola o custo do próprio script).
+- Informa segmentos/s, tempo por etapa e pico de memória em JSON, para comparar
+  resultados entre commits.
+
+Exemplos:
+    python benchmark.py --tradutor simulado --saida bench_output.txt
+    python benchmark.py --tradutor argos --pasta-modelo ./modelos --arquivos 20
+"""
+
+import os
+import sys
+import io
+import json
+import time
+import random
+import shutil
+import argparse
+import platform
+import tempfile
+import contextlib
+import subprocess
+import tracemalloc
+import importlib.util
+
+CAMINHO_SCRIPT_PADRAO = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Pack 4.5.py")
+
+# --- Geração de Corpus Sintético ---
+
+PERSONAGENS = ['e', 'mc', 'sylvie', 'narrator', 'boss']
+EXPRESSOES = ['', ' happy', ' sad', ' angry']
+FRASES = [
+    "Hello there, how are you?", "I don't know what you're talking about.",
+    "We should get going before it gets dark.", "Dude, that was awesome!",
+    "To whom it may concern, I kindly request your assistance.",
+    "The sun rises over the quiet village.", "Can you help me with this?",
+    "I'm gonna grab something to eat, wanna come?", "Thank you so much for everything.",
+    "It has been {b}[days]{/b} days since we last met.", "Hi {i}[name]{/i}, long time no see!",
+    "Press {color=#f00}Start{/color} to begin.", "You have [gold] coins left.",
+    "Furthermore, the documentation shall be provided by the committee.",
+    "Yeah, for real, no worries.", "Where did you put the keys?",
+]
+
+def gerar_frase(aleatorio):
+    """Sorteia uma frase, às vezes juntando duas para formar parágrafos mais longos."""
+    frase = aleatorio.choice(FRASES)
+    if aleatorio.random() < 0.3:
+        frase = f"{frase} {aleatorio.choice(FRASES)}"
+    if aleatorio.random() < 0.2:
+        frase = frase.replace("you", f"you{aleatorio.randint(1, 50)}", 1)
+    return frase
+
+def gerar_arquivo_rpy(caminho, blocos, aleatorio):
+    """Escreve um .rpy sintético no formato das pastas game/tl/<idioma>."""
+    linhas = []
+    for i in range(blocos):
+        linhas.append(f"# game/script.rpy:{i * 10}\n")
+        linhas.append(f"translate portuguese bloco_{i:05d}:\n\n")
+        tipo = aleatorio.random()
+        frase = gerar_frase(aleatorio)
+        if tipo < 0.6:
+            quem = aleatorio.choice(PERSONAGENS) + aleatorio.choice(EXPRESSOES)
+            linhas.append(f'    # {quem} "{frase}"\n')
+            linhas.append(f'    {quem} ""\n\n')
+        else:
+            linhas.append(f'    # "{frase}"\n')
+            linhas.append('    ""\n\n')
+        if i % 5 == 0:
+            linhas.append("    $ renpy.pause(0.5)\n")
+            linhas.append("    show bg room with dissolve\n\n")
+    linhas.append("translate portuguese strings:\n\n")
+    for _ in range(max(1, blocos // 4)):
+        linhas.append(f'    old "{gerar_frase(aleatorio)}"\n')
+        linhas.append('    new ""\n\n')
+    with open(caminho, 'w', encoding='utf-8') as f:
+        f.writelines(linhas)
+
+def gerar_corpus_rpy(pasta, arquivos, blocos_por_arquivo, semente=42):
+    """Gera uma pasta com `arquivos` .rpy de tamanhos variados."""
+    aleatorio = random.Random(semente)
+    os.makedirs(pasta, exist_ok=True)
+    for i in range(arquivos):
+        blocos = max(1, int(blocos_por_arquivo * aleatorio.uniform(0.3, 1.7)))
+        gerar_arquivo_rpy(os.path.join(pasta, f"script_{i:03d}.rpy"), blocos, aleatorio)
+
+def gerar_docx(caminho, paragrafos, semente=42):
+    """Gera um .docx com `paragrafos` parágrafos (requer python-docx)."""
+    import docx
+    aleatorio = random.Random(semente)
+    documento = docx.Document()
+    for i in range(paragrafos):
+        if i % 20 == 0:
+            documento.add_paragraph('')
+        else:
+            documento.add_paragraph(gerar_frase(aleatorio))
+    documento.save(caminho)
+
+# --- Instrumentação ---
+
+def carregar_script(caminho_script):
+    """Importa o script principal como módulo (o nome do arquivo tem espaço e ponto)."""
+    spec = importlib.util.spec_from_file_location("super_tradutor", caminho_script)
+    modulo = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(modulo)
+    return modulo
+
+ETAPAS = [
+    'traduzir_com_protecao_de_codigo', 'aplicar_correcoes_contextuais_ptbr',
+    'detectar_formalidade_ingles', 'aplicar_adaptacao_ptbr',
+    'pretraduzir', 'coletar_slots_arquivo_rpy', 'reescrever_rpy',
+]
+
+class Cronometro:
+    """Envolve funções do módulo para acumular o tempo gasto em cada etapa."""
+
+    def __init__(self, modulo):
+        self.modulo = modulo
+        self.tempos = {}
+        self._originais = {}
+        self._em_andamento = set()
+
+    def _envolver(self, nome, funcao):
+        tempos = self.tempos
+        em_andamento = self._em_andamento
+        def envolvida(*args, **kwargs):
+            # Só a chamada mais externa de cada etapa conta: TradutorEmLote.translate()
+            # chama traduzir_lote(), e o tempo do modelo não pode entrar duas vezes.
+            if nome in em_andamento:
+                return funcao(*args, **kwargs)
+            em_andamento.add(nome)
+            inicio = time.perf_counter()
+            try:
+                return funcao(*args, **kwargs)
+            finally:
+                em_andamento.discard(nome)
+                tempos[nome] = tempos.get(nome, 0.0) + time.perf_counter() - inicio
+        return envolvida
+
+    def instalar(self, tradutor):
+        for nome in ETAPAS:
+            if hasattr(self.modulo, nome):
+                self._originais[nome] = getattr(self.modulo, nome)
+                setattr(self.modulo, nome, self._envolver(nome, self._originais[nome]))
+        # O tempo do modelo é medido no próprio tradutor.
+        for metodo in ('translate', 'traduzir_lote'):
+            if hasattr(tradutor, metodo):
+                setattr(tradutor, metodo, self._envolver('modelo', getattr(tradutor, metodo)))
+
+    def remover(self):
+        for nome, funcao in self._originais.items():
+            setattr(self.modulo, nome, funcao)
+        self._originais.clear()
+
+def preparar_tradutor(modulo, args, diretorio_base):
+    """Define TRADUTOR/MEMORIA do módulo conforme --tradutor e retorna o tradutor."""
+    modulo.CONFIGURACAO['usar_memoria_disco'] = False
+    modulo.CONFIGURACAO['usar_manifesto'] = False
+    modulo.CONFIGURACAO['tamanho_lote'] = args.lote
+    modulo.CONFIGURACAO['backend'] = args.tradutor
+    if args.tradutor == 'argos':
+        modulo.CONFIGURACAO['threads_modelo'] = args.threads_intra
+        modulo.CONFIGURACAO['beam_size'] = args.beam
+        modulo.CONFIGURACAO['tipo_calculo'] = args.tipo_calculo
+        with contextlib.redirect_stdout(io.StringIO()):
+            modulo.inicializar_traducao(args.pasta_modelo or diretorio_base, "en", "pb")
+    else:
+        # Backend 'simulado' do próprio script, com o custo pedido na linha de comando.
+        modulo.TRADUTOR = modulo.TradutorSimulado(args.custo_chamada_ms, args.custo_segmento_ms)
+        modulo.MEMORIA = modulo.MemoriaTraducao(None)
+    return modulo.TRADUTOR
+
+@contextlib.contextmanager
+def medir(resultado):
+    """Mede tempo de parede e pico de memória (tracemalloc) de um bloco."""
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        resultado['segundos'] = time.perf_counter() - inicio
+        resultado['pico_memoria_mb'] = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+        tracemalloc.stop()
+
+def executar_cenario(modulo, args, nome, diretorio_base, funcao):
+    """Executa um cenário com tradutor novo e cache vazio, instrumentado por etapa."""
+    tradutor = preparar_tradutor(modulo, args, diretorio_base)
+    # modo_docx() chama inicializar_traducao(); o tradutor preparado acima é mantido.
+    inicializar_original = modulo.inicializar_traducao
+    modulo.inicializar_traducao = lambda *a, **k: None
+    cronometro = Cronometro(modulo)
+    cronometro.instalar(tradutor)
+    resultado = {'cenario': nome}
+    try:
+        with medir(resultado), contextlib.redirect_stdout(io.StringIO()):
+            segmentos = funcao()
+    finally:
+        cronometro.remover()
+        modulo.inicializar_traducao = inicializar_original
+    resultado['segmentos'] = segmentos
+    resultado['segmentos_por_segundo'] = segmentos / resultado['segundos'] if resultado['segundos'] else 0.0
+    resultado['etapas_segundos'] = {etapa: round(t, 6) for etapa, t in sorted(cronometro.tempos.items())}
+    if isinstance(tradutor, modulo.TradutorSimulado):
+        resultado['chamadas_modelo'] = tradutor.chamadas
+    resultado['memoria_traducao'] = modulo.MEMORIA.estatisticas()
+    return resultado
+
+# --- Cenários ---
+
+def cenario_rpy(modulo, args, pasta_corpus, pasta_trabalho):
+    """processar_arquivo_rpy() em cada arquivo de uma cópia nova do corpus."""
+    if os.path.exists(pasta_trabalho):
+        shutil.rmtree(pasta_trabalho)
+    shutil.copytree(pasta_corpus, pasta_trabalho)
+    def executar():
+        total = 0
+        for nome in sorted(os.listdir(pasta_trabalho)):
+            if nome.endswith('.rpy'):
+                total += modulo.processar_arquivo_rpy(os.path.join(pasta_trabalho, nome)) or 0
+        return total
+    return executar
+
+def cenario_paragrafos(modulo, textos):
+    """processar_paragrafo_completo() linha a linha, sem lote prévio."""
+    def executar():
+        for texto in textos:
+            modulo.processar_paragrafo_completo(texto)
+        return len(textos)
+    return executar
+
+def cenario_docx(modulo, caminho_docx, paragrafos):
+    """modo_docx() de ponta a ponta."""
+    def executar():
+        modulo.modo_docx(caminho_docx)
+        return paragrafos
+    return executar
+
+def obter_commit(caminho_script):
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=os.path.dirname(caminho_script),
+            stderr=subprocess.DEVNULL, text=True,
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do Super Tradutor Automático.")
+    parser.add_argument('--script', default=CAMINHO_SCRIPT_PADRAO, help="Caminho do script a medir.")
+    parser.add_argument('--tradutor', choices=['simulado', 'argos'], default='simulado',
+                        help="'simulado' isola o custo do script; 'argos' usa o modelo real.")
+    parser.add_argument('--pasta-modelo', default=None, help="Pasta com o .argosmodel (modo argos).")
+    parser.add_argument('--arquivos', type=int, default=10, help="Arquivos .rpy no corpus (padrão: 10).")
+    parser.add_argument('--blocos', type=int, default=300, help="Blocos por arquivo .rpy, em média (padrão: 300).")
+    parser.add_argument('--paragrafos', type=int, default=2000, help="Parágrafos do .docx (padrão: 2000).")
+    parser.add_argument('--lote', type=int, default=32, help="Tamanho do lote enviado ao modelo.")
+    parser.add_argument('--threads-intra', type=int, default=0, help="Argos: threads do CTranslate2 (0 = automático).")
+    parser.add_argument('--beam', type=int, default=4, help="Argos: tamanho do beam (padrão: 4).")
+    parser.add_argument('--tipo-calculo', default='default', help="Argos: compute_type do CTranslate2 (ex.: int8).")
+    parser.add_argument('--custo-chamada-ms', type=float, default=0.0,
+                        help="Simulado: custo fixo por chamada ao modelo, em ms.")
+    parser.add_argument('--custo-segmento-ms', type=float, default=0.0,
+                        help="Simulado: custo por segmento traduzido, em ms.")
+    parser.add_argument('--semente', type=int, default=42)
+    parser.add_argument('--saida', default=None, help="Arquivo JSON de saída (padrão: imprime na tela).")
+    args = parser.parse_args()
+
+    modulo = carregar_script(args.script)
+    relatorio = {
+        'commit': obter_commit(args.script),
+        'python': platform.python_version(),
+        'plataforma': platform.platform(),
+        'tradutor': args.tradutor,
+        'parametros': {k: v for k, v in vars(args).items() if k not in ('script', 'saida')},
+        'resultados': [],
+    }
+
+    with tempfile.TemporaryDirectory(prefix="bench_tradutor_") as temporario:
+        pasta_corpus = os.path.join(temporario, 'corpus')
+        gerar_corpus_rpy(pasta_corpus, args.arquivos, args.blocos, args.semente)
+        textos = [slot.texto for nome in sorted(os.listdir(pasta_corpus))
+                  for slot in modulo.coletar_slots_arquivo_rpy(os.path.join(pasta_corpus, nome))]
+
+        relatorio['resultados'].append(executar_cenario(
+            modulo, args, 'processar_arquivo_rpy', temporario,
+            cenario_rpy(modulo, args, pasta_corpus, os.path.join(temporario, 'trabalho'))))
+        relatorio['resultados'].append(executar_cenario(
+            modulo, args, 'processar_paragrafo_completo', temporario, cenario_paragrafos(modulo, textos)))
+
+        try:
+            caminho_docx = os.path.join(temporario, 'documento.docx')
+            gerar_docx(caminho_docx, args.paragrafos, args.semente)
+        except ImportError:
+            print("⚠️  python-docx não instalado: cenário modo_docx ignorado.", file=sys.stderr)
+        else:
+            relatorio['resultados'].append(executar_cenario(
+                modulo, args, 'modo_docx', temporario, cenario_docx(modulo, caminho_docx, args.paragrafos)))
+
+    saida = json.dumps(relatorio, ensure_ascii=False, indent=2)
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as f:
+            f.write(saida + '\n')
+        for resultado in relatorio['resultados']:
+            print(f"{resultado['cenario']:<30} {resultado['segmentos_por_segundo']:>10.1f} seg/s "
+                  f"{resultado['segundos']:>8.2f}s  pico {resultado['pico_memoria_mb']:.1f} MB")
+    else:
+        print(saida)
+
+if __name__ == "__main__":
+    main()